@@ -43,8 +43,11 @@ def smart_filter(data):
     if df.empty:
         return df
     vec, clf = init_classifier()
-    desc = df['description'] if 'description' in df.columns else pd.Series([''] * len(df), index=df.index)
-    texts = (df['title'].fillna('') + ' ' + desc.fillna('')).map(preprocess_text)
+    # الأعمدة الإنجليزية أو أعمدة الكاشط العربية ("الوصف" من صفحات التفاصيل)
+    empty = pd.Series([''] * len(df), index=df.index)
+    title = next((df[c] for c in ('title', 'العنوان', 'اسم المنافسة') if c in df.columns), empty)
+    desc = next((df[c] for c in ('description', 'الوصف') if c in df.columns), empty)
+    texts = (title.fillna('') + ' ' + desc.fillna('')).map(preprocess_text)
     probs = clf.predict_proba(vec.transform(texts))
     df['relevance_score'] = [round(p[1], 2) for p in probs]
     df['classification'] = df['relevance_score'].apply(lambda x: 'مرتفع' if x >= 0.7 else ('متوسط' if x >= 0.4 else 'منخفض'))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+توحيد النص العربي في مكان واحد لكل المسارات (فلترة الكلمات، تخطيط الاستعلامات، المطابقة التقريبية، التحليل):
+NFKC أولاً (أشكال العرض العربية U+FB50–U+FEFF الشائعة في نصوص PDF، والحروف المركبة، تصبح حروفاً عادية)، ثم
+حذف التشكيل والتطويل، توحيد الألف/الياء/التاء المربوطة، تحويل الأرقام العربية-الهندية، ثم ضم المسافات —
+بتمريرة str.translate واحدة وتعبير نمطي واحد، مع كاش للنصوص المتكررة.
+    normalize("إبتكارُ  ٢٠٢٥")            -> "ابتكار 2025"
+    normalize(s, punct=True)              -> علامات الترقيم تصبح مسافة (للمطابقة التقريبية)
+    normalize_series(df["النشاط الاساسي"]) -> عمود كامل، كل قيمة مميزة تُوحَّد مرة واحدة
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# التشكيل (الحركات وعلامات القرآن والألف الخنجرية) والتطويل تُحذف
+_DROP = [*range(0x0610, 0x061B), *range(0x064B, 0x0660), 0x0670, 0x0640]
+_FOLD = {"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه"}
+_TABLE = str.maketrans({
+    **{chr(c): None for c in _DROP},
+    **_FOLD,
+    **{chr(0x0660 + d): str(d) for d in range(10)},   # ٠-٩
+    **{chr(0x06F0 + d): str(d) for d in range(10)},   # ۰-۹ (فارسية)
+})
+_SPACE = re.compile(r"\s+")
+_PUNCT = re.compile(r"\W+")   # يشمل المسافات: الترقيم والمسافات تُضم معاً في مسافة واحدة
+
+
+@lru_cache(maxsize=65536)
+def _normalize(s, lower, punct):
+    if not s.isascii():
+        s = unicodedata.normalize("NFKC", s)
+    s = (_PUNCT if punct else _SPACE).sub(" ", s.translate(_TABLE)).strip()
+    return s.lower() if lower else s
+
+
+def _is_null(v):
+    # None / NaN / NaT / pd.NA (الأخير لا يقبل bool)
+    try:
+        return v is None or bool(v != v)
+    except TypeError:
+        return True
+
+
+def normalize(s, lower=True, punct=False):
+    """النص الموحّد ("" لـ None وNaN). lower لحروف اللاتينية، punct لاستبدال علامات الترقيم بمسافة."""
+    if not isinstance(s, str):
+        s = "" if _is_null(s) else str(s)
+    return _normalize(s, lower, punct)
+
+
+def normalize_series(values, lower=True, punct=False):
+    """
+    نسخة عمود كامل: كل قيمة مميزة تُوحَّد مرة واحدة ثم تُوزَّع بـ map. القيم الفارغة (NaN/None) تصبح "" لا "nan".
+    يعيد pandas.Series بنفس الفهرس (أو بفهرس افتراضي إن لم تكن values سلسلة pandas).
+    """
+    import pandas as pd
+    s = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype="object")
+    present = s.notna()
+    cache = {v: normalize(v, lower, punct) for v in s[present].unique()}
+    out = pd.Series("", index=s.index, dtype="object")
+    out[present] = s[present].map(cache)
+    return out
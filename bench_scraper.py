@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+قياسات أداء مصغّرة لمرحلة التحليل في scraper.py و card_parser.py.
+    python bench_scraper.py                    # صفحات مُولَّدة
+    python bench_scraper.py saved/*.html       # صفحات اعتماد محفوظة
+"""
+import re
+import sys
+import time
+import timeit
+
+from bs4 import BeautifulSoup
+
+import scraper
+import card_parser
+from config import BASE_URL
+
+SAMPLE_CARD = """
+<div class="card-body">
+  <h5>توريد وتنظيم فعالية هاكاثون الابتكار</h5>
+  <span>الجهة الحكومية: وزارة الاتصالات وتقنية المعلومات</span> |
+  <span>الرقم المرجعي: 250139012345</span> |
+  <span>نوع المنافسة: منافسة عامة</span> |
+  <span>قيمة وثائق المنافسة: 500.00</span> |
+  <span>آخر موعد للاستفسارات: 2025/01/20</span> |
+  <span>آخر موعد لتقديم العروض: 2025/02/01</span> |
+  <span>تاريخ النشر: 2025/01/10</span>
+  <a href="/Tender/Details/123456">تفاصيل</a>
+</div>
+"""
+
+
+# المستخرج السابق (استدعاء re.search جديد لكل اسم حقل) — مرجع للمقارنة فقط
+def _legacy_grab(label, txt):
+    m = re.search(rf"{label}\s*[:：]?\s*([^\n|]+)", txt)
+    return m.group(1).strip() if m else ""
+
+def _legacy_extract_from_card(card):
+    txt = card.get_text(" ", strip=True)
+    a   = card.find("a", href=True)
+    t   = card.find(["h5","h4","a"])
+
+    link  = a["href"] if a else ""
+    link  = link if link.startswith("http") else (BASE_URL.rstrip("/") + link if link else "")
+    title = t.get_text(strip=True) if t else ""
+
+    g = _legacy_grab
+    return {
+        "النشاط الاساسي": g("النشاط الاساسي", txt) or g("نوع المنافسة", txt),
+        "اخر توقيت لاستلام الاستفسارات": g("اخر توقيت لاستلام الاستفسارات", txt) or g("آخر موعد للاستفسارات", txt),
+        "قيمة الكراسة": g("قيمة الكراسة", txt) or g("قيمة وثائق المنافسة", txt),
+        "الجهة": g("الجهة", txt) or g("الجهة الحكومية", txt) or g("الجهة الحكومية المعلنة", txt),
+        "الرقم المرجعي": g("الرقم المرجعي", txt) or g("رقم المنافسة", txt) or g("رقم المرجع", txt),
+        "اخر موعد لتقديم العرض": g("اخر موعد لتقديم العرض", txt) or g("آخر موعد لتقديم العروض", txt),
+        "الرابط": link,
+        "العنوان": title,
+        "تاريخ نشرها": g("تاريخ نشرها", txt) or g("تاريخ النشر", txt) or g("تاريخ الطرح", txt),
+    }
+
+
+def _timeit(fn, arg, n, repeat=5):
+    """أفضل زمن (ميكروثانية لكل استدعاء) من عدة تكرارات لتقليل الضجيج."""
+    return min(timeit.repeat(lambda: fn(arg), number=n, repeat=repeat)) / n * 1e6
+
+
+def bench_extractor(n=5000):
+    card = BeautifulSoup(SAMPLE_CARD, "lxml").select_one("div.card-body")
+    old, new = _legacy_extract_from_card(card), scraper._extract_from_card(card_parser.search_cards(SAMPLE_CARD)[0])
+    assert old == new, (old, new)
+
+    # نقيس مرحلة الاستخراج من النص فقط (get_text مشتركة بين الاثنين)
+    txt = card.get_text(" ", strip=True)
+    def legacy_fields(s):
+        return {c: next((v for a in al for v in [_legacy_grab(a, s)] if v), "") for c, al in scraper.FIELD_ALIASES.items()}
+
+    assert legacy_fields(txt) == scraper._fields(txt)
+    t_old = _timeit(legacy_fields, txt, n)
+    t_new = _timeit(scraper._fields, txt, n)
+    print(f"field extraction: legacy {t_old:.1f}us/card | single-pass {t_new:.1f}us/card | x{t_old / t_new:.1f}")
+    # عناصر fallback (div عام بلا أسماء حقول): المستخرج السابق يمسح النص كاملاً 17 مرة
+    noise = "القائمة الرئيسية الخدمات الإلكترونية المنافسات والمشتريات الحكومية " * 30
+    assert legacy_fields(noise) == scraper._fields(noise)
+    t_old = _timeit(legacy_fields, noise, n // 5)
+    t_new = _timeit(scraper._fields, noise, n // 5)
+    print(f"fallback div ({len(noise)} chars, no labels): legacy {t_old:.1f}us | single-pass {t_new:.1f}us | x{t_old / t_new:.1f}")
+
+
+
+def _listing_page(n_cards=50):
+    """صفحة قائمة مُولَّدة تشبه AllTendersForVisitor (بطاقات + روابط تفاصيل + ضجيج تنقل)."""
+    nav = "<nav>" + "".join(f"<div class='menu'><a href='/m{i}'>رابط {i}</a></div>" for i in range(40)) + "</nav>"
+    cards = "".join(
+        f"<div class='tender-card'><div class='card-body'>{SAMPLE_CARD.replace('123456', str(i))}"
+        f"<a href='/Tender/Details/{i}'>تفاصيل</a></div></div>"
+        for i in range(n_cards)
+    )
+    return f"<html><head><script>var x = 1;</script></head><body>{nav}<main>{cards}</main></body></html>"
+
+
+def bench_backends(pages, n=20):
+    """يقارن محركي التحليل على نفس الصفحات ويتحقق من تطابق البطاقات."""
+    for name, html in pages:
+        for fn in (card_parser.search_cards, card_parser.detail_cards):
+            a = [(c.text, c.href, c.title) for c in fn(html, backend="bs4")]
+            b = [(c.text, c.href, c.title) for c in fn(html, backend="lxml")]
+            if a != b:
+                print(f"  ! {name}: {fn.__name__} differs between backends ({len(a)} vs {len(b)} cards)")
+            t_bs = _timeit(lambda h: fn(h, backend="bs4"), html, n, repeat=3) / 1000
+            t_lx = _timeit(lambda h: fn(h, backend="lxml"), html, n, repeat=3) / 1000
+            print(f"{name} {fn.__name__} ({len(b)} cards): bs4 {t_bs:.1f}ms | lxml {t_lx:.1f}ms | x{t_bs / t_lx:.1f}")
+
+
+def bench_parse_pool(pages, copies=16, workers=(1, 2, 4)):
+    """تحليل نفس الصفحات عبر scraper._parse_stream بعدد عمليات مختلف (1 = في نفس الخيط)."""
+    stream = [(i, html) for i in range(copies) for _, html in pages]
+    expected = [scraper._page_items(h) for _, h in stream]
+    baseline = None
+    for w in workers:
+        t = time.perf_counter()
+        out = [items for _, items in scraper._parse_stream(iter(stream), workers=w)]
+        dt = time.perf_counter() - t
+        assert out == expected
+        baseline = baseline or dt
+        print(f"parse pool ({len(stream)} pages): workers={w} {dt * 1000:.0f}ms | x{baseline / dt:.1f}")
+
+if __name__ == "__main__":
+    bench_extractor()
+    if sys.argv[1:]:
+        pages = [(p, open(p, encoding="utf-8", errors="replace").read()) for p in sys.argv[1:]]
+    else:
+        pages = [("synthetic-listing", _listing_page())]
+    bench_backends(pages)
+    bench_parse_pool(pages)
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+استخراج بطاقات المنافسات من صفحات اعتماد بمحرّك تحليل قابل للتبديل:
+  - "lxml": lxml.html + XPath، لا يُبنى إلا ما يلزم من كل بطاقة (النص، الرابط، العنوان)
+  - "bs4" : BeautifulSoup الكامل (السلوك السابق، للمقارنة)
+كل بطاقة تُعاد ككائن Card بسيط بغض النظر عن المحرك.
+"""
+import threading
+
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup
+
+from config import PARSER_BACKEND, FALLBACK_MAX_LINKS, FALLBACK_DEPTH, FALLBACK_MAX_CARDS
+
+
+class Card:
+    __slots__ = ("text", "href", "title")
+
+    def __init__(self, text, href, title):
+        self.text = text      # نص البطاقة كاملاً (get_text(" ", strip=True))
+        self.href = href      # رابط البطاقة ("" إن لم يوجد)
+        self.title = title    # العنوان / اسم المنافسة
+
+    def __repr__(self):
+        return f"Card({self.title!r}, {self.href!r})"
+
+
+_BLOCK_TAGS = ("li", "article", "div")
+_CHROME_TAGS = ("nav", "header", "footer")
+_CHROME_SCAN_DEPTH = 40   # سقف الصعود بحثاً عن nav/header/footer (العمل الكلي ≤ FALLBACK_MAX_LINKS × هذا)
+
+def _repeated_blocks(anchors, parent, tag, classes, ident):
+    """
+    fallback محدود العمل: بدل فحص كل li/article/div في الصفحة، نصعد من كل رابط (حتى FALLBACK_MAX_LINKS رابطاً)
+    FALLBACK_DEPTH مستويات ونجمع العناصر حسب (الأب، الوسم، الأصناف). أكثر مجموعة تكراراً (عنصران على الأقل)
+    هي البطاقات؛ عند التساوي نفضّل الأبعد عن الرابط (البطاقة كاملة لا جزءاً منها).
+    روابط القوائم (nav/header/footer) لا تُحتسب. العمل لكل صفحة محدود بـ FALLBACK_MAX_LINKS × _CHROME_SCAN_DEPTH.
+    """
+    groups = {}
+    for i, a in enumerate(anchors):
+        if i >= FALLBACK_MAX_LINKS:
+            break
+        chain, node, depth = [], parent(a), 0
+        while node is not None and depth < _CHROME_SCAN_DEPTH:
+            t = tag(node)
+            if t in _CHROME_TAGS:
+                chain = None
+                break
+            if depth < FALLBACK_DEPTH and t in _BLOCK_TAGS:
+                chain.append((node, depth))
+            node, depth = parent(node), depth + 1
+        for el, d in chain or ():
+            p = parent(el)
+            key = (ident(p) if p is not None else None, tag(el), classes(el))
+            g = groups.setdefault(key, [{}, d])
+            g[0][ident(el)] = el
+            g[1] = max(g[1], d)
+    if not groups:
+        return []
+    members, _ = max(groups.values(), key=lambda g: (len(g[0]), g[1]))
+    if len(members) < 2:
+        return []
+    return list(members.values())[:FALLBACK_MAX_CARDS]
+
+
+# ---------- lxml ----------
+
+# عناصر لا يحسب BeautifulSoup نصها في get_text (نحاكيه هنا)
+_SKIP_TEXT = {"script", "style", "template", "rt", "rp"}
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _lx_strings(el):
+    """نصوص العنصر وأبنائه بترتيب المستند (بدون ذيل العنصر نفسه)، كما يفعل bs4."""
+    out = []
+    for event, node in etree.iterwalk(el, events=("start", "end")):
+        if event == "start":
+            # التعليقات/التعليمات: نتجاهل نصها ونبقي ذيلها
+            if node.text and isinstance(node.tag, str) and node.tag not in _SKIP_TEXT:
+                out.append(node.text)
+        elif node is not el and node.tail:
+            out.append(node.tail)
+    return out
+
+def _lx_text(el, sep=" "):
+    return sep.join(s.strip() for s in _lx_strings(el) if s.strip())
+
+_PARSERS = threading.local()
+
+def _lx_parser():
+    # huge_tree: الصفحات المعطوبة قد تتجاوز حد العمق الافتراضي (256) فتُقتطع بصمت
+    p = getattr(_PARSERS, "parser", None)
+    if p is None:
+        p = _PARSERS.parser = lxml.html.HTMLParser(huge_tree=True)
+    return p
+
+def _lx_doc(html):
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html, parser=_lx_parser())
+    except (etree.ParserError, ValueError):
+        return None
+
+_XP_CARD_BODY = etree.XPath(f"//div[{_has_class('card-body')}]")
+_XP_CARD = etree.XPath(f"//div[{_has_class('card')}]")
+_XP_LINKS = etree.XPath("//a[@href]")
+_XP_FIRST_LINK = etree.XPath("(.//a[@href])[1]")
+_XP_FIRST_HEAD = etree.XPath("(.//*[self::h5 or self::h4 or self::a])[1]")
+
+def _lx_search_cards(html):
+    doc = _lx_doc(html)
+    if doc is None:
+        return []
+    nodes = _XP_CARD_BODY(doc) or _XP_CARD(doc) or _repeated_blocks(
+        _XP_LINKS(doc),
+        parent=lambda e: e.getparent(),
+        tag=lambda e: e.tag,
+        classes=lambda e: " ".join(sorted((e.get("class") or "").split())),
+        ident=lambda e: e,
+    )
+    cards = []
+    for n in nodes:
+        a = _XP_FIRST_LINK(n)
+        t = _XP_FIRST_HEAD(n)
+        cards.append(Card(_lx_text(n), a[0].get("href") if a else "", _lx_text(t[0], "") if t else ""))
+    return cards
+
+# بطاقات صفحة AllTendersForVisitor: نفهرسها بروابط "تفاصيل" في مرور واحد
+# يحاكي a.string في bs4: نص مباشر، أو عنصر ابن وحيد نصه "تفاصيل"
+_XP_DETAILS = etree.XPath(
+    "//a[contains(@href, '/Tender/Details')]"
+    "[(not(*) and contains(., 'تفاصيل')) or (count(node()) = 1 and *[not(*) and contains(., 'تفاصيل')])]"
+)
+_NAME_XPATHS = [etree.XPath(f"(.//{x})[1]") for x in (
+    f"a[{_has_class('tender-title')}]", f"a[{_has_class('title')}]", "h1", "h2", "h3",
+    f"*[{_has_class('tender-title')}]", f"*[{_has_class('title')}]", "a",
+)]
+
+def _lx_closest_card(a):
+    node = a
+    for _ in range(6):
+        if node is None:
+            break
+        if node.tag in ("div", "section", "article"):
+            cls = " ".join((node.get("class") or "").split())
+            if "card" in cls or "media" in cls:
+                return node
+        node = node.getparent()
+    for anc in a.iterancestors("div", "section", "article"):
+        return anc
+    return a.getparent()
+
+def _lx_card_name(card):
+    for xp in _NAME_XPATHS:
+        el = xp(card)
+        if el:
+            txt = _lx_text(el[0], "")
+            if txt and "تفاصيل" not in txt:
+                return _lx_text(el[0])
+    return ""
+
+def _lx_detail_cards(html):
+    doc = _lx_doc(html)
+    if doc is None:
+        return []
+    cards = []
+    for a in _XP_DETAILS(doc):
+        card = _lx_closest_card(a)
+        text = _lx_text(card)
+        name = _lx_card_name(card) or text.split("\n")[0].strip()
+        cards.append(Card(text, a.get("href") or "", name))
+    return cards
+
+
+# صفحة تفاصيل منافسة واحدة (/Tender/Details...): أزواج "اسم الحقل" ← قيمة
+DETAIL_LABELS = {
+    "اسم المنافسة": ("اسم المنافسة",),
+    "الرقم المرجعي": ("الرقم المرجعي",),
+    "الجهة": ("الجهة الحكومية", "الجهة"),
+    "النشاط": ("نشاط المنافسة", "النشاط الاساسي", "النشاط الأساسي", "النشاط"),
+    "الوصف": ("الغرض من المنافسة", "وصف المنافسة", "الوصف"),
+    "قيمة وثائق المنافسة": ("قيمة وثائق المنافسة", "قيمة الكراسة"),
+    "نوع المنافسة": ("نوع المنافسة",),
+    "مدة العقد": ("مدة العقد",),
+    "حالة المنافسة": ("حالة المنافسة",),
+}
+_DETAIL_FIELD = {label: col for col, labels in DETAIL_LABELS.items() for label in labels}
+_XP_LEAVES = etree.XPath("//body//*[not(*)][normalize-space()]")
+
+def _lx_label_value(el):
+    """قيمة الحقل المجاور للعنوان: العنصر الشقيق التالي، وإلا ذيل العنوان، وإلا شقيق الأب التالي."""
+    for node in (el, el.getparent()):
+        if node is None:
+            continue
+        sib = node.getnext()
+        while sib is not None and not (isinstance(sib.tag, str) and _lx_text(sib)):
+            sib = sib.getnext()
+        if sib is not None:
+            return _lx_text(sib)
+        if node.tail and node.tail.strip():
+            return node.tail.strip()
+    return ""
+
+def detail_fields(html):
+    """
+    حقول صفحة تفاصيل المنافسة {العمود: القيمة} (lxml فقط). يطابق العناصر الورقية التي نصها اسم حقل معروف
+    ("اسم:" أو "اسم: قيمة" في نفس العنصر)؛ أول قيمة غير فارغة لكل عمود تُعتمد.
+    """
+    doc = _lx_doc(html)
+    if doc is None:
+        return {}
+    out = {}
+    for el in _XP_LEAVES(doc):
+        if el.tag in _SKIP_TEXT:
+            continue
+        txt = _lx_text(el)
+        label, sep, rest = txt.partition(":")
+        if not sep:
+            label, sep, rest = txt.partition("：")
+        col = _DETAIL_FIELD.get(label.strip())
+        if col is None or col in out:
+            continue
+        value = rest.strip() or _lx_label_value(el)
+        if value and value.rstrip(":： ") not in _DETAIL_FIELD:
+            out[col] = value
+    return out
+
+
+# ---------- BeautifulSoup (المرجع السابق) ----------
+
+def _bs_search_cards(html):
+    soup = BeautifulSoup(html, "lxml")
+    nodes = soup.select("div.card-body") or soup.select("div.card") or _repeated_blocks(
+        soup.find_all("a", href=True, limit=FALLBACK_MAX_LINKS),
+        parent=lambda e: e.parent if e.parent is not None and e.parent.name != "[document]" else None,
+        tag=lambda e: e.name,
+        classes=lambda e: " ".join(sorted(e.get("class", []))),
+        ident=id,
+    )
+    cards = []
+    for n in nodes:
+        a = n.find("a", href=True)
+        t = n.find(["h5", "h4", "a"])
+        cards.append(Card(n.get_text(" ", strip=True), a["href"] if a else "", t.get_text(strip=True) if t else ""))
+    return cards
+
+def _bs_closest_card(a):
+    node = a
+    for _ in range(6):
+        if not node: break
+        if node.name in ("div","section","article") and ("card" in " ".join(node.get("class", [])) or "media" in " ".join(node.get("class", []))):
+            return node
+        node = node.parent
+    return a.find_parent(["div","section","article"]) or a.parent
+
+def _bs_detail_cards(html):
+    soup = BeautifulSoup(html, "lxml")
+    cards = []
+    for a in soup.find_all("a", string=lambda x: x and "تفاصيل" in x):
+        href = a.get("href") or ""
+        if "/Tender/Details" not in href:
+            continue
+        card = _bs_closest_card(a)
+        name = ""
+        for sel in ["a.tender-title","a.title","h1","h2","h3",".tender-title",".title","a"]:
+            el = card.select_one(sel)
+            if el and el.get_text(strip=True) and "تفاصيل" not in el.get_text(strip=True):
+                name = el.get_text(" ", strip=True)
+                break
+        text = card.get_text(" ", strip=True)
+        cards.append(Card(text, href, name or text.split("\n")[0].strip()))
+    return cards
+
+
+_BACKENDS = {
+    "lxml": (_lx_search_cards, _lx_detail_cards),
+    "bs4": (_bs_search_cards, _bs_detail_cards),
+}
+
+def search_cards(html, backend=PARSER_BACKEND):
+    """بطاقات صفحة نتائج البحث (div.card-body ثم div.card ثم البنى المتكررة المحتوية على روابط)."""
+    return _BACKENDS[backend][0](html)
+
+def detail_cards(html, backend=PARSER_BACKEND):
+    """بطاقات قائمة المنافسات مفهرسة بروابط "تفاصيل" (Card.href = رابط /Tender/Details)."""
+    return _BACKENDS[backend][1](html)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+نقاط استئناف (checkpoints) للزحف: حالة الزحف (ما أُنجز من صفحات/استعلامات + الروابط المرئية + النتائج الجزئية)
+تُكتب ذرّياً (ملف مؤقت ثم os.replace) بعد كل صفحة، فانقطاع العملية لا يترك ملفاً مبتوراً.
+كل نقطة مربوطة بمفتاح المهمة (الاستعلامات + الإعدادات + التاريخ): نقطة لمهمة أخرى أو ليوم آخر تُتجاهل.
+"""
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from config import CHECKPOINT_DIR
+
+
+def job_key(*parts):
+    """مفتاح ثابت لمهمة زحف من مكوناتها (قوائم/نصوص/أرقام قابلة للتحويل إلى JSON)."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    def __init__(self, name, key, root=CHECKPOINT_DIR):
+        self.key = key
+        self.path = os.path.join(root, name + ".json")
+        os.makedirs(root, exist_ok=True)
+
+    def load(self):
+        """الحالة المحفوظة لنفس المهمة، أو None (لا نقطة / مهمة مختلفة / ملف تالف)."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != self.key:
+            return None
+        return data.get("state")
+
+    def save(self, state):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "saved_at": datetime.now().isoformat(timespec="seconds"), "state": state},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """بعد اكتمال الزحف: لا شيء لاستئنافه."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -13,6 +13,72 @@ KEYWORDS = KEYWORDS_AR + KEYWORDS_EN
 BASE_URL = "https://portal.etimad.sa/"
 SEARCH_PATH = "/ar-sa/search/searchindex?searchText="
 
+# الجلب المتوازي: عدد العمّال والحد الأقصى للطلبات المتزامنة لكل مضيف
+FETCH_WORKERS = 8
+PER_HOST_CONCURRENCY = 4
+
+# محدِّد المعدل التكيّفي لكل مضيف (طلب/ثانية): يبدأ من INITIAL، ينخفض حتى MIN عند 429/503، ويرتفع حتى MAX مع الردود السليمة
+RATE_LIMIT_INITIAL = 4.0
+RATE_LIMIT_MIN = 0.2
+RATE_LIMIT_MAX = 8.0
+RATE_LIMIT_BURST = 2
+
+# تحليل الصفحات: 1 = في نفس الخيط (الافتراضي؛ تشغيل مجمع عمليات يكلف أكثر مما يوفّر مع عشرات الصفحات)،
+# 0 = مجمع بعدد الأنوية، N = مجمع بـ N عملية (اختياري لإعادة تحليل أرشيف كبير مثلاً)
+# وأقصى عدد صفحات في دفعة تُرسل لعملية واحدة عند استخدام المجمع
+PARSE_WORKERS = 1
+PARSE_BATCH_SIZE = 4
+
+# كاش HTTP على القرص (ETag / Last-Modified) لصفحات البحث
+HTTP_CACHE_DIR = ".cache/http"
+
+# الطلبات المحوّطة بين مرايا اعتماد: مهلة افتراضية قبل إرسال نفس الطلب للمرآة الأخرى (بلا عينات بعد)،
+# وحدودها عندما تُحسب من مدرَّج أزمنة المضيف الأساسي (النسبة HEDGE_QUANTILE)
+HEDGE_DELAY = 3.0
+HEDGE_MIN_DELAY = 0.5
+HEDGE_MAX_DELAY = 10.0
+HEDGE_QUANTILE = 0.9
+
+# نقاط استئناف الزحف (تُحدَّث ذرّياً بعد كل صفحة؛ --resume يكمل منها)
+CHECKPOINT_DIR = ".cache/checkpoints"
+
+# حجم الدفعة في الواجهة المتدفقة (iter_opportunity_batches → update_sheet_stream)
+STREAM_BATCH_SIZE = 20
+
+# إثراء المنافسات من صفحات التفاصيل: عدد العمّال، وكاش النتائج لكل رقم مرجعي (تُجلب صفحة كل منافسة مرة واحدة فقط)
+DETAILS_ENABLED = True
+DETAIL_WORKERS = 4
+DETAILS_CACHE_DIR = ".cache/details"
+
+# أرشيف HTML الخام المضغوط (لإعادة التحليل دون شبكة)
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = "data/archive"
+
+# تقليم المطابقة التقريبية بفهرس مقاطع الحروف: طول المقطع، وأقل نسبة من مقاطع الكلمة يجب أن تظهر في النص
+# لتُرسل الكلمة إلى المقارنة المكلفة (أقل = أدق وأبطأ)
+NGRAM_SIZE = 3
+NGRAM_MIN_OVERLAP = 0.4
+
+# محرك تحليل HTML للبطاقات: "lxml" (سريع، XPath) أو "bs4" (BeautifulSoup الكامل)
+PARSER_BACKEND = "lxml"
+
+# fallback عند غياب div.card-body/div.card: حد أقصى للروابط المفحوصة، عمق الصعود من الرابط، وعدد البطاقات المعادة
+FALLBACK_MAX_LINKS = 2000
+FALLBACK_DEPTH = 4
+FALLBACK_MAX_CARDS = 200
+
+# المخزن المحلي (SQLite) لكل المنافسات: المرجع للتحليل وإزالة التكرار، والشيت إسقاط يُزامن بالفروق فقط
+# على Drive بجانب وحدات المشروع (لا نسبةً لمجلد العمل)، فيبقى نفس المخزن بين جلسات كولاب
+TENDER_DB_PATH = "/content/drive/MyDrive/opportunity_agent/data/tenders.sqlite"
+
+# علامة الزحف التدريجي (المراجع/الروابط المرئية وعمق كل تشغيل) على Drive أيضاً: بدونها يصبح كل تشغيل زحفاً كاملاً
+WATERMARK_PATH = "/content/drive/MyDrive/opportunity_agent/data/etimad_watermark.json"
+
+# حذف صفوف الشيت: عدد النطاقات المتصلة في كل طلب batchUpdate، ونسبة المحذوف التي يصبح بعدها
+# إعادة كتابة الصفوف الباقية أرخص من الحذف (filter_and_delete_rows مع strategy="auto")
+DELETE_RANGES_PER_REQUEST = 500
+DELETE_REWRITE_RATIO = 0.5
+
 # Google Sheets الهدف
 SHEET_ID  = "15eOK-kuB2zGOWsNCo1WTu28Xgb8L9Kqzib2UMrHtiwU"
 SHEET_TAB = "Sheet1"
@@ -24,5 +90,14 @@ SHEET_COLUMNS = [
     "الجهة","الرقم المرجعي","اخر موعد لتقديم العرض","الرابط","العنوان","تاريخ نشرها"
 ]
 
+# اعتماد Google API المشترك (Sheets / Drive / Gmail): ملف العميل، التوكن، وتجديد التوكن قبل انتهائه بهذه الثواني
+GOOGLE_CREDENTIALS_FILE = "credentials.json"
+GOOGLE_TOKEN_FILE = "token.json"
+GOOGLE_TOKEN_REFRESH_MARGIN = 300
+
+# فهرس محلي لعمود "الرقم المرجعي" (رقم الصف ← المرجع) لإزالة التكرار دون قراءة الشيت، وحجم الصفحة عند إعادة بنائه
+REF_INDEX_DIR = ".cache/ref_index"
+REF_PAGE_SIZE = 5000
+
 # مجلد Drive (غير مستخدم حالياً)
 DRIVE_FOLDER_ID = "1usCVByq8h-IN2DOXw_buoI9u0vGTCG84"
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+تحليل التواريخ بمسار سريع للصيغ التي تظهر فعلاً في اعتماد:
+ISO (2025-01-10 / 2025/01/10)، d/m/Y (10/01/2025 / 10-1-25)، الأرقام العربية-الهندية، و"اليوم"/"أمس".
+النتائج تُخزّن مؤقتاً لكل نص. التاريخ الرقمي يُحسم بالمسار السريع وحده (اليوم أولاً كما في اعتماد؛ غير الصالح
+مثل 2025-13-01 والهجري لا يُخمَّنان)، وما ليس رقمياً ("10 يناير 2025") يذهب إلى dateparser بترتيب DMY
+(يُستورد عند أول حاجة فقط) مع عدّ النصوص التي احتاجته.
+"""
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+_ISO_RE = re.compile(r"(\d{4})[/-](\d{1,2})[/-](\d{1,2})")
+_DMY_RE = re.compile(r"(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})")
+_TODAY_WORDS = ("اليوم", "today")
+_YESTERDAY_WORDS = ("أمس", "امس", "yesterday")
+
+STATS = {"fast": 0, "relative": 0, "fallback": 0, "failed": 0}
+_DATEPARSER_SETTINGS = {"DATE_ORDER": "DMY"}
+
+
+def _ymd(y, m, d):
+    y, m, d = int(y), int(m), int(d)
+    if y < 100:
+        y += 2000
+    if y < 1900:
+        # سنة هجرية (14xx) أو غير منطقية: لا تُحوَّل إلى date (parse_date_iso يعيد الهجري بصيغته النصية)
+        return None
+    try:
+        return date(y, m, d)
+    except ValueError:
+        return None
+
+
+def _numeric(t):
+    """(سنة، شهر، يوم) نصوصاً لأول تاريخ رقمي في النص (Y-m-d ثم d/m/Y)، أو None."""
+    m = _ISO_RE.search(t)
+    if m:
+        return m.groups()
+    m = _DMY_RE.search(t)
+    if m:
+        d, mn, y = m.groups()
+        return y, mn, d
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_absolute(t):
+    parts = _numeric(t)
+    if parts is not None:
+        # لا يُرسل إلى dateparser: كان سيبدّل اليوم والشهر (12/13/2025، 2025-13-01) أو يقرأ الهجري كميلادي
+        d = _ymd(*parts)
+        STATS["fast" if d else "failed"] += 1
+        return d
+    STATS["fallback"] += 1
+    import dateparser  # ثقيل: لا نستورده إلا للنصوص المتبقية
+    dt = dateparser.parse(t, languages=["ar", "en"], settings=_DATEPARSER_SETTINGS)
+    if dt is None:
+        STATS["failed"] += 1
+        return None
+    return dt.date()
+
+
+def parse_date(text, today=None):
+    """يعيد datetime.date أو None. الكلمات النسبية ("اليوم") لا تُخزَّن لأنها تتغير بتغير اليوم."""
+    t = str(text or "").strip().translate(_DIGITS)
+    if not t:
+        return None
+    low = t.lower()
+    if any(w in low for w in _TODAY_WORDS):
+        STATS["relative"] += 1
+        return today or datetime.now().date()
+    if any(w in low for w in _YESTERDAY_WORDS):
+        STATS["relative"] += 1
+        return (today or datetime.now().date()) - timedelta(days=1)
+    return _parse_absolute(t)
+
+
+def _hijri_iso(t):
+    # الصياغة النصية القديمة لـ _parse_date_iso كما هي للسنوات قبل 1900 (هجري: 12/05/1446 -> 1446-05-12)
+    parts = _numeric(t)
+    if parts is None:
+        return ""
+    y, mn, d = parts
+    y = int("20" + y if len(y) == 2 else y)
+    return f"{y:04d}-{int(mn):02d}-{int(d):02d}" if y < 1900 else ""
+
+
+def parse_date_iso(text):
+    """مثل parse_date لكن يعيد "YYYY-MM-DD" أو "" (بديل _parse_date_iso في دفتر الملاحظات)؛ الهجري يبقى بصيغته."""
+    d = parse_date(text)
+    return d.isoformat() if d else _hijri_iso(str(text or "").strip().translate(_DIGITS))
+
+
+def is_today(text, today=None):
+    if not text:
+        return False
+    today = today or datetime.now().date()
+    return parse_date(text, today=today) == today
+
+
+def stats():
+    """عدادات المسار السريع/البديل + إحصاءات الكاش."""
+    info = _parse_absolute.cache_info()
+    return dict(STATS, cache_hits=info.hits, cache_size=info.currsize)
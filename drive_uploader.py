@@ -1,15 +1,11 @@
 from __future__ import print_function
 import os
-import pickle
 import re
 import pandas as pd
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
 
 from config import DRIVE_FOLDER_ID
+from google_clients import service as google_service
 
 # الصلاحيات المطلوبة (Drive + Sheets معاً)
 SCOPES = [
@@ -35,28 +31,8 @@ def sanitize_filename(name, idx=0):
 
 def upload_to_drive(results):
     """يرفع الملفات إلى Google Drive"""
-    creds = None
-
-    # تحميل التوكن لو موجود
-
-    if os.path.exists('token.json'):
-        try:
-            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-        except Exception as e:
-            print(f"⚠️ Error loading token.json: {e}")
-            creds = None
-
-    # تسجيل الدخول لأول مرة
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.json', 'wb') as token:
-            pickle.dump(creds, token)
-
-    service = build('drive', 'v3', credentials=creds)
+    # عميل مشترك (google_clients): تسجيل الدخول والتوكن مرة واحدة للعملية، ويخدم Sheets أيضاً
+    service = google_service('drive', 'v3', SCOPES)
     uploaded_files = []
 
     # قراءة البيانات
@@ -4,46 +4,20 @@ Handles sending reports via Gmail API
 """
 
 import os
-import pickle
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 import base64
 
 from config import EMAIL_RECIPIENTS
+from google_clients import service as google_service
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 
 def get_gmail_service():
     """Initialize Gmail API service and handle token creation"""
-    creds = None
-
-    # ✅ Load existing credentials if available
-    if os.path.exists('token.json'):
-        try:
-            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-        except Exception as e:
-            print(f"⚠️ Error loading credentials: {e}")
-
-    # ✅ If no valid creds, start OAuth flow
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists('credentials.json'):
-                raise FileNotFoundError("❌ credentials.json not found! Please add your Google OAuth file.")
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-
-        # Save the new token
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-
-    return build('gmail', 'v1', credentials=creds)
+    # Shared process-wide client (google_clients): credentials, token refresh and discovery handled once
+    return google_service('gmail', 'v1', SCOPES)
 
 
 def create_message_with_attachment(sender, to, subject, message_text, file_path):
@@ -150,6 +150,10 @@ drive.mount('/content/drive')
 
 import datetime as _dt
 from gspread_formatting import CellFormat, Color, format_cell_ranges
+from tender_store import TenderStore, SheetProjection, delete_row_ranges, forget_ref_index
+
+# local SQLite record of every tender; the sheet is a projection synced with minimal deltas
+STORE = TenderStore()
 
 DATE_FMT = "%Y-%m-%d"
 
@@ -173,6 +177,7 @@ def _ensure_schema_columns(df: pd.DataFrame) -> pd.DataFrame:
 def _clear_body(ws):
     if ws.row_count > 1:
         ws.batch_clear([f"A2:{chr(ord('A')+len(SCHEMA)-1)}{ws.row_count}"])
+        forget_ref_index(ws)
 
 def _append_rows(ws, rows):
     if not rows:
@@ -191,27 +196,88 @@ def _read_all_as_df(ws) -> pd.DataFrame:
             df[col] = pd.NA
     return df[SCHEMA].copy()
 
-def weekly_cleanup(ws, today_str: str):
-    df = _read_all_as_df(ws)
-    if df.empty:
-        return
-    dates = pd.to_datetime(df["تاريخ_الإدراج"], errors="coerce")
-    cutoff = pd.to_datetime(today_str) - pd.Timedelta(days=7)
-    keep_mask = dates.isna() | (dates >= cutoff)
-    new_df = df[keep_mask].copy()
-    _clear_body(ws)
-    rows = new_df.fillna("").values.tolist()
-    _append_rows(ws, rows)
+HIGHLIGHT_COLOR = Color(0.98, 0.98, 0.90)
+
+def _col_letter(name):
+    return chr(ord('A') + SCHEMA.index(name))
+
+def _date_ref_columns(ws):
+    # only the two columns cleanup needs, in one values_batch_get call (not the whole sheet)
+    d, r = _col_letter("تاريخ_الإدراج"), _col_letter("الرقم المرجعي")
+    res = ws.spreadsheet.values_batch_get([f"'{ws.title}'!{d}2:{d}", f"'{ws.title}'!{r}2:{r}"],
+                                          params={"majorDimension": "COLUMNS"})
+    dates, refs = [((vr.get("values") or [[]])[0]) for vr in res.get("valueRanges", [{}, {}])]
+    n = max(len(dates), len(refs))
+    dates = pd.to_datetime(pd.Series(dates + [""] * (n - len(dates)), dtype="object"), errors="coerce")
+    refs = [str(x).strip() for x in refs + [""] * (n - len(refs))]
+    return dates, refs
+
+def _expired_rows(dates, today_str: str, keep_days: int = 7):
+    # sheet row numbers (header = 1) dated before the cutoff; rows without a date are kept, as before
+    cutoff = pd.to_datetime(today_str) - pd.Timedelta(days=keep_days)
+    return [i + 2 for i, d in enumerate(dates) if pd.notna(d) and d < cutoff]
+
+def _delete_requests(ws, ranges):
+    return [{"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS",
+                                           "startIndex": start - 1, "endIndex": end}}} for start, end in ranges]
+
+def _cell(v):
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return {"userEnteredValue": {"numberValue": v}}
+    return {"userEnteredValue": {"stringValue": "" if v is None else str(v)}}
+
+def _background_request(ws, start_row, end_row, color):
+    # 0-based [start_row, end_row) over the schema columns
+    return {"repeatCell": {
+        "range": {"sheetId": ws.id, "startRowIndex": start_row, "endRowIndex": end_row,
+                  "startColumnIndex": 0, "endColumnIndex": len(SCHEMA)},
+        "cell": {"userEnteredFormat": {"backgroundColor": {"red": color.red, "green": color.green, "blue": color.blue}}},
+        "fields": "userEnteredFormat.backgroundColor"}}
+
+def weekly_cleanup(ws, today_str: str, keep_days: int = 7):
+    """Delete only the expired rows: reads the date column, deletes contiguous ranges bottom-up in one batch."""
+    dates, _ = _date_ref_columns(ws)
+    ranges = delete_row_ranges(ws, _expired_rows(dates, today_str, keep_days))
+    return {"expired": sum(e - s + 1 for s, e in ranges), "ranges": len(ranges)}
+
+def sync_today_rows(ws, df_today: pd.DataFrame, today_str: str):
+    """
+    Today-only write (same sheet as write_today_only and the store path) as ONE spreadsheet.batch_update
+    after one 2-column read: appendCells with today's rows (RAW values) after the old body, delete the old
+    body as a single range, then highlight the rows just written. With no rows for today the old body is
+    cleared in place instead (a sheet cannot lose all of its non-frozen rows).
+    """
+    df_today = _prepare_today_df(df_today, today_str)
+    dates, _ = _date_ref_columns(ws)
+    old = len(dates)
+    rows = df_today.values.tolist()
+
+    requests = []
+    if rows:
+        requests.append({"appendCells": {"sheetId": ws.id, "fields": "userEnteredValue",
+                                         "rows": [{"values": [_cell(v) for v in r]} for r in rows]}})
+        requests += _delete_requests(ws, [(2, old + 1)] if old else [])
+        requests.append(_background_request(ws, 1, 1 + len(rows), HIGHLIGHT_COLOR))
+    elif old:
+        requests.append({"updateCells": {
+            "range": {"sheetId": ws.id, "startRowIndex": 1, "endRowIndex": old + 1,
+                      "startColumnIndex": 0, "endColumnIndex": len(SCHEMA)},
+            "fields": "userEnteredValue,userEnteredFormat.backgroundColor"}})
+    if old:
+        forget_ref_index(ws)  # row numbers shift: sheets_handler rebuilds its saved ref index on next use
+    if requests:
+        ws.spreadsheet.batch_update({"requests": requests})
+    return {"removed": old, "appended": len(rows)}
 
 def highlight_today_rows(ws, today_str: str):
     last_row = ws.row_count
     if last_row < 2:
         return
     rng = f"A2:{chr(ord('A')+len(SCHEMA)-1)}{last_row}"
-    fmt = CellFormat(backgroundColor=Color(0.98, 0.98, 0.90))
+    fmt = CellFormat(backgroundColor=HIGHLIGHT_COLOR)
     format_cell_ranges(ws, [(rng, fmt)])
 
-def write_today_only(ws, df_today: pd.DataFrame, today_str: str):
+def _prepare_today_df(df_today: pd.DataFrame, today_str: str) -> pd.DataFrame:
     df_today = df_today.copy()
     if "قيمة المنافسة" in df_today.columns:
         df_today["قيمة المنافسة"] = _coerce_value_series(df_today["قيمة المنافسة"])
@@ -219,28 +285,49 @@ def write_today_only(ws, df_today: pd.DataFrame, today_str: str):
         if c in df_today.columns:
             df_today[c] = _coerce_date_series(df_today[c])
     df_today["تاريخ_الإدراج"] = today_str
-    df_today = _ensure_schema_columns(df_today).fillna("")
+    return _ensure_schema_columns(df_today).fillna("")
+
+def write_today_only(ws, df_today: pd.DataFrame, today_str: str):
+    df_today = _prepare_today_df(df_today, today_str)
     _clear_body(ws)
     _append_rows(ws, df_today.values.tolist())
     highlight_today_rows(ws, today_str)
 
-def sync_today_sheet(df_today: pd.DataFrame):
+def sync_today_sheet(df_today: pd.DataFrame, use_store: bool = True):
+    # both paths leave a today-only sheet (README: "today-only visibility"), today's rows highlighted
     today_str = today_ksa_date()
-    weekly_cleanup(ws, today_str)
-    write_today_only(ws, df_today, today_str)
-    print(f"Synced today-only rows: {len(df_today)}")
-    print("Highlight applied.")
-    print("Weekly cleanup done (older than 7 days).")
+    if use_store:
+        # upsert into SQLite, then push only the delta (range deletes / changed rows / appends) to today's projection
+        rows = _prepare_today_df(df_today, today_str).to_dict("records")
+        inserted, updated = STORE.upsert(rows, seen_on=today_str)
+        stats = SheetProjection(STORE, ws, SCHEMA).sync(STORE.rows(seen_on=today_str))
+        # highlight only what was just written: kept rows already carry it (one repeatCell, no whole-sheet format)
+        fresh = stats["rows"] if stats["rewrite"] else stats["inserted"]
+        if fresh:
+            ws.spreadsheet.batch_update({"requests": [
+                _background_request(ws, stats["rows"] + 1 - fresh, stats["rows"] + 1, HIGHLIGHT_COLOR)]})
+        print(f"Store: {inserted} new, {updated} changed, {STORE.count()} total | sheet delta: {stats}")
+        return
+    stats = sync_today_rows(ws, df_today, today_str)
+    print(f"Synced today rows: {len(df_today)} | {stats}")
 
 # =========================================
 # Cell 3 — Etimad scraper (requests list-cards → fields; keyword filter; fallback)
 # =========================================
 
-import re, time, random
+import os, re, json, time, random
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 from urllib.parse import urljoin
+from card_parser import detail_cards  # lxml/XPath افتراضياً؛ detail_cards(html, backend="bs4") للمقارنة
+from date_utils import parse_date_iso as _parse_date_iso  # مسار سريع + كاش، وdateparser للبقية فقط
+from rate_limiter import LIMITER  # token bucket تكيّفي لكل مضيف (يبطئ عند 429/503 ويحترم Retry-After)
+from tender_details import fetch_details  # صفحات التفاصيل: جلب متوازٍ + كاش لكل رقم مرجعي
+from hedged_fetch import HEDGER  # طلبات محوّطة بين المرايا حسب مدرَّج أزمنة كل مضيف
+from checkpoint import Checkpoint, job_key  # نقطة استئناف ذرّية بعد كل صفحة
+from keyword_matcher import KeywordMatcher  # Aho-Corasick: مسح واحد لكل نص لكل الكلمات
+from html_archive import HtmlArchive  # أرشيف HTML خام مضغوط لإعادة التحليل دون شبكة
+from config import ARCHIVE_ENABLED, ARCHIVE_DIR, WATERMARK_PATH as CFG_WATERMARK_PATH
 
 LIST_PAGES = [
     "https://tenders.etimad.sa/Tender/AllTendersForVisitor",
@@ -258,22 +345,10 @@ AR_KW = [
 ]
 EN_KW = ["hackathon","innovation","innovate","innovator","innovators","event","events","activity","activities"]
 
-_AR_DIAC = re.compile(r"[\u0617-\u061A\u064B-\u0652\u0670\u065F]")
-def _norm_ar(s):
-    s = str(s or "")
-    s = _AR_DIAC.sub("", s)
-    s = s.replace("أ","ا").replace("إ","ا").replace("آ","ا")
-    s = s.replace("ى","ي").replace("ئ","ي").replace("ؤ","و").replace("ة","ه")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-def _norm_all(s): return _norm_ar(s).lower()
+# built once: one pass per text whatever the keyword count (arabic_norm.normalize by default)
+_KW_MATCHER = KeywordMatcher(AR_KW + EN_KW)
 def _kw_ok(name, entity):
-    t = _norm_all((name or "") + " " + (entity or ""))
-    for k in AR_KW:
-        if _norm_ar(k) in t: return True
-    for k in EN_KW:
-        if k.lower() in t: return True
-    return False
+    return _KW_MATCHER.any((name or "") + " " + (entity or ""))
 
 def _session():
     s = requests.Session()
@@ -284,46 +359,32 @@ def _session():
         "Connection": "keep-alive",
     })
     return s
-def _get(s, url, params=None, sleep=0.7, timeout=45):
-    r = s.get(url, params=params, timeout=timeout, allow_redirects=True)
-    r.raise_for_status()
-    if sleep: time.sleep(sleep)
-    return r
-
-def _parse_date_iso(text):
-    txt = str(text or "")
-    m = re.search(r"(\d{4})[/-](\d{2})[/-](\d{2})", txt)
-    if m: return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
-    m = re.search(r"(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})", txt)
-    if m:
-        d,mn,yy = m.groups(); yy = "20"+yy if len(yy)==2 else yy
-        return f"{int(yy):04d}-{int(mn):02d}-{int(d):02d}"
-    return ""
+def _get(s, url, params=None, timeout=45, tries=3):
+    # pacing comes from the shared limiter (adapts to 429/503 + Retry-After) instead of a fixed sleep
+    for attempt in range(tries):
+        LIMITER.acquire(url)
+        try:
+            r = s.get(url, params=params, timeout=timeout, allow_redirects=True)
+        except requests.RequestException:
+            LIMITER.report_error(url)
+            if attempt == tries - 1: raise
+            continue
+        LIMITER.report(url, r.status_code, r.headers.get("Retry-After"))
+        if r.status_code in (429, 503) and attempt < tries - 1:
+            continue
+        r.raise_for_status()
+        return r
 
 def _parse_money(text):
     if text is None: return None
     t = re.sub(r"[^\d.]", "", str(text))
     return None if t=="" else float(t)
 
-def _closest_card(a):
-    node = a
-    for _ in range(6):
-        if not node: break
-        if node.name in ("div","section","article") and ("card" in " ".join(node.get("class", [])) or "media" in " ".join(node.get("class", []))):
-            return node
-        node = node.parent
-    return a.find_parent(["div","section","article"]) or a.parent
-
-def _extract_from_card(base_url, card, details_href):
-    name = ""
-    for sel in ["a.tender-title","a.title","h1","h2","h3",".tender-title",".title","a"]:
-        el = card.select_one(sel)
-        if el and el.get_text(strip=True) and "تفاصيل" not in el.get_text(strip=True):
-            name = el.get_text(" ", strip=True)
-            break
-    if not name:
-        name = card.get_text(" ", strip=True).split("\n")[0].strip()
-    text = card.get_text(" ", strip=True)
+def _extract_from_card(base_url, card):
+    # card: card_parser.Card — الاسم والنص ورابط "تفاصيل" جاهزة من محرك التحليل
+    name = card.title
+    text = card.text
+    details_href = card.href
     ref = ""
     m = re.search(r"(?:الرقم\s*المرجعي|Reference|Tender\s*No)\s*[:\-]?\s*([A-Za-z0-9\/\-]{6,})", text)
     if m: ref = m.group(1).strip()
@@ -350,48 +411,202 @@ def _extract_from_card(base_url, card, details_href):
         "الرابط": link,
     }
 
-def scrape_list_cards(max_pages=6, per_page_delay=0.7, max_rows=250):
-    s = _session()
-    rows = []
-    seen_links = set()
-    for base in LIST_PAGES:
-        for pn in range(1, max_pages+1):
-            try:
-                r = _get(s, base, params={"PageNumber": pn}, sleep=per_page_delay)
-            except Exception:
+# --- Incremental crawl watermark: known refs/links + depth reached per run ---
+# on Drive by default (config.WATERMARK_PATH), so the incremental crawl survives new Colab sessions
+WATERMARK_PATH = os.getenv("ETIMAD_WATERMARK", CFG_WATERMARK_PATH)
+WATERMARK_MAX_ITEMS = 5000   # keep the newest N refs/links
+WATERMARK_MAX_RUNS = 200
+
+def _load_watermark(path=WATERMARK_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            wm = json.load(f)
+    except (OSError, ValueError):
+        wm = {}
+    wm.setdefault("refs", []); wm.setdefault("links", []); wm.setdefault("runs", [])
+    return wm
+
+def _touch(items, seen):
+    # items seen this run move to the end, so trimming to the newest N drops the least recently seen
+    seen = list(dict.fromkeys(seen))
+    recent = set(seen)
+    return [x for x in items if x not in recent] + seen
+
+def _save_watermark(wm, path=WATERMARK_PATH):
+    wm["refs"] = wm["refs"][-WATERMARK_MAX_ITEMS:]
+    wm["links"] = wm["links"][-WATERMARK_MAX_ITEMS:]
+    wm["runs"] = wm["runs"][-WATERMARK_MAX_RUNS:]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(wm, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+_PENDING_WATERMARKS = {}   # watermark_path -> update from a finished crawl, waiting for commit_watermark()
+
+def commit_watermark(watermark_path=WATERMARK_PATH):
+    """Persist the pending watermark of a crawl run with save_watermark=False (call once its rows are written)."""
+    wm = _PENDING_WATERMARKS.pop(watermark_path, None)
+    if wm is not None:
+        _save_watermark(wm, watermark_path)
+
+LIST_COLUMNS = [
+    "اسم المنافسة","الرقم المرجعي","الجهة","قيمة المنافسة",
+    "اخر موعد للاستفسار","اخر موعد للتقديم","الرابط"
+]
+
+# listing pages get their own archive root so scraper.reparse_archive (search pages) never sees them
+LIST_ARCHIVE_DIR = os.path.join(ARCHIVE_DIR, "list")
+_LIST_ARCHIVE = None
+
+def _list_archive():
+    global _LIST_ARCHIVE
+    if _LIST_ARCHIVE is None:
+        _LIST_ARCHIVE = HtmlArchive(LIST_ARCHIVE_DIR)
+    return _LIST_ARCHIVE
+
+def reparse_list_archive(since=None, until=None):
+    """Listing records rebuilt offline from archived pages (since/until: ISO dates, until inclusive)."""
+    archive, rows, seen_links = _list_archive(), [], set()
+    for entry in archive.entries(since=since, until=until):
+        for card in detail_cards(archive.read(entry)):
+            rec = _extract_from_card(entry["meta"]["base"], card)
+            if (not rec["اسم المنافسة"] or re.search(r"(بحث|search|المنافسات)$", rec["اسم المنافسة"], re.I)
+                    or rec["الرابط"] in seen_links):
                 continue
-            soup = BeautifulSoup(r.text, "lxml")
-            for a in soup.find_all("a", string=lambda x: x and "تفاصيل" in x):
-                href = a.get("href") or ""
-                if "/Tender/Details" not in href:
-                    continue
-                card = _closest_card(a)
-                rec = _extract_from_card(base, card, href)
-                if not rec["اسم المنافسة"] or re.search(r"(بحث|search|المنافسات)$", rec["اسم المنافسة"], re.I):
+            seen_links.add(rec["الرابط"])
+            rows.append(dict(rec, fetched_at=entry["fetched_at"]))
+    return pd.DataFrame(rows, columns=LIST_COLUMNS + ["fetched_at"])
+
+def iter_list_cards(max_pages=6, max_rows=250, incremental=True, watermark_path=WATERMARK_PATH, hedge=True,
+                    resume=False, save_watermark=True):
+    """
+    Generator: yields each listing record as soon as its page is parsed.
+    incremental=True: stop paginating once a page holds only tenders seen on earlier runs
+    (listing is newest-first). Pass incremental=False to force a full walk of max_pages.
+    hedge=True: LIST_PAGES are treated as mirrors of one listing; each page goes to the host with the
+    best latency history and is re-sent to the other mirror if it has not answered within the budget.
+    hedge=False keeps the old strictly sequential host order.
+    The watermark only advances when the stream is consumed to the end: an exception or an early stop
+    (consumer or sheet-write error) leaves it untouched, so the next run walks those pages again.
+    save_watermark=False keeps the update pending until commit_watermark() (after the rows are written).
+    After every page the frontier (last page done, rows, seen links) is checkpointed atomically;
+    resume=True continues today's interrupted crawl from there (saved rows are yielded first).
+    """
+    s = _session()
+    ckpt = Checkpoint("list_cards", job_key(LIST_PAGES, max_pages, max_rows, incremental, hedge, today_ksa_date()))
+    state = (ckpt.load() if resume else None) or {"pos": None, "rows": [], "seen_links": []}
+    rows = list(state["rows"])
+    seen_links = set(state["seen_links"])
+    wm = _load_watermark(watermark_path)
+    known_refs, known_links = set(wm["refs"]), set(wm["links"])
+    run = {"at": dt.datetime.now(KSA_TZ).isoformat(timespec="seconds"), "base": None, "depth": 0, "stopped_on_seen": False}
+    try:
+        if state["pos"]:
+            print(f"Resuming after page {state['pos'][1]} with {len(rows)} saved rows")
+            yield from rows
+        for bi, bases in enumerate([LIST_PAGES] if hedge else [[b] for b in LIST_PAGES]):
+            for pn in range(1, max_pages+1):
+                if state["pos"] and [bi, pn] <= state["pos"]:
                     continue
-                if rec["الرابط"] in seen_links:
+                try:
+                    base, r = HEDGER.get(bases, lambda b, pn=pn: _get(s, b, params={"PageNumber": pn}))
+                except Exception:
                     continue
-                seen_links.add(rec["الرابط"])
-                rows.append(rec)
+                run["base"], run["depth"] = base, pn
+                if ARCHIVE_ENABLED:
+                    _list_archive().append(f"{bases[0]}?PageNumber={pn}", r.text, meta={"base": bases[0], "page": pn, "host": base})
+                page_cards, page_new = 0, 0
+                for card in detail_cards(r.text):
+                    # links are built on the first mirror whichever host answered, so dedup/watermark stay stable
+                    rec = _extract_from_card(bases[0], card)
+                    if not rec["اسم المنافسة"] or re.search(r"(بحث|search|المنافسات)$", rec["اسم المنافسة"], re.I):
+                        continue
+                    page_cards += 1
+                    if rec["الرابط"] not in known_links and not (rec["الرقم المرجعي"] and rec["الرقم المرجعي"] in known_refs):
+                        page_new += 1
+                    if rec["الرابط"] in seen_links:
+                        continue
+                    seen_links.add(rec["الرابط"])
+                    rows.append(rec)
+                    yield rec
+                    if len(rows) >= max_rows:
+                        break
+                state.update(pos=[bi, pn], rows=rows, seen_links=sorted(seen_links))
+                ckpt.save(state)
                 if len(rows) >= max_rows:
                     break
-            if len(rows) >= max_rows:
+                if incremental and page_cards and not page_new:
+                    run["stopped_on_seen"] = True
+                    break
+            if rows:
                 break
-        if rows:
-            break
-    df = pd.DataFrame(rows, columns=[
-        "اسم المنافسة","الرقم المرجعي","الجهة","قيمة المنافسة",
-        "اخر موعد للاستفسار","اخر موعد للتقديم","الرابط"
-    ])
+        ckpt.clear()
+        run["rows"] = len(rows)
+        wm["refs"] = _touch(wm["refs"], [r["الرقم المرجعي"] for r in rows if r["الرقم المرجعي"]])
+        wm["links"] = _touch(wm["links"], [r["الرابط"] for r in rows])
+        wm["runs"].append(run)
+        if save_watermark:
+            _save_watermark(wm, watermark_path)
+        else:
+            _PENDING_WATERMARKS[watermark_path] = wm
+    finally:
+        print(f"Crawl depth: {run['depth']} page(s) on {run['base']} | stopped on seen: {run['stopped_on_seen']}")
+        print(LIMITER.summary())
+        print(HEDGER.summary())
+
+def iter_list_batches(batch_size=20, **kw):
+    """iter_list_cards in lists of batch_size (last one may be shorter) for batch consumers."""
+    batch = []
+    for rec in iter_list_cards(**kw):
+        batch.append(rec)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def scrape_list_cards(max_pages=6, max_rows=250, incremental=True, watermark_path=WATERMARK_PATH):
+    rows = list(iter_list_cards(max_pages, max_rows, incremental, watermark_path))
+    return pd.DataFrame(rows, columns=LIST_COLUMNS)
+
+def enrich_with_details(df):
+    """
+    Fill truncated/missing card fields from each tender's /Tender/Details page and add
+    "النشاط" + "الوصف" (extra columns; the sheet keeps SCHEMA only). Pages are fetched
+    concurrently through the shared limiter and cached per reference number, so each
+    tender's details are downloaded once over its lifetime.
+    """
+    if df.empty:
+        return df
+    details = fetch_details(df.to_dict("records"), session=_session())
+    df = df.copy()
+    pick = lambda col: [d.get(col, "") for d in details]
+    df["النشاط"] = pick("النشاط")
+    df["الوصف"] = pick("الوصف")
+    full_name = pd.Series(pick("اسم المنافسة"), index=df.index)
+    df["اسم المنافسة"] = full_name.where(full_name.str.len() > df["اسم المنافسة"].str.len(), df["اسم المنافسة"])
+    entity = pd.Series(pick("الجهة"), index=df.index)
+    df["الجهة"] = df["الجهة"].where(df["الجهة"] != "", entity)
+    fees = pd.Series([_parse_money(v) if v else None for v in pick("قيمة وثائق المنافسة")], index=df.index, dtype="object")
+    df["قيمة المنافسة"] = df["قيمة المنافسة"].where(df["قيمة المنافسة"].notna(), fees)
     return df
 
-def build_today_df_from_scrape():
-    df_all = scrape_list_cards(max_pages=10, max_rows=400)
-    if df_all.empty:
+def build_today_df_from_scrape(enrich=True, resume=False):
+    # keyword filter runs on the stream batch by batch: only matches (+ a 30-row fallback) are kept in memory
+    # resume=True: re-run this cell after a crash to continue today's crawl from its checkpoint
+    kw_rows, head_rows = [], []
+    # the watermark stays pending until the rows reach the sheet (commit_watermark below)
+    for batch in iter_list_batches(max_pages=10, max_rows=400, resume=resume, save_watermark=False):
+        texts = [(r["اسم المنافسة"] or "") + " " + (r["الجهة"] or "") for r in batch]
+        kw_rows.extend(r for r, ok in zip(batch, _KW_MATCHER.mask_column(texts)) if ok)
+        head_rows.extend(batch[:30 - len(head_rows)])
+    if not head_rows:
         print("List parse produced 0 rows.")
-        return df_all.assign(**{"تاريخ_الإدراج": today_ksa_date()})
-    df_kw = df_all[df_all.apply(lambda r: _kw_ok(r["اسم المنافسة"], r["الجهة"]), axis=1)].copy()
-    out = df_kw if not df_kw.empty else df_all.head(30).copy()
+        return pd.DataFrame(columns=LIST_COLUMNS).assign(**{"تاريخ_الإدراج": today_ksa_date()})
+    out = pd.DataFrame(kw_rows or head_rows, columns=LIST_COLUMNS)
+    if enrich:
+        out = enrich_with_details(out)
     out["تاريخ_الإدراج"] = today_ksa_date()
     return out
 
@@ -401,6 +616,7 @@ if len(df_today) > 0:
     print(f"Rows written today: {len(df_today)}")
 else:
     print("No rows extracted.")
+commit_watermark()  # only reached once the crawl finished and the sheet write succeeded
 
 !pip -q install requests beautifulsoup4 lxml dateparser google-api-python-client google-auth
 
@@ -484,7 +700,8 @@ print("Created placeholder config.py")
 # pip install rapidfuzz  # optional but recommended
 
 import re
-import unicodedata
+from arabic_norm import normalize  # shared Arabic normalization: one translate pass + one regex, cached
+from ngram_index import TrigramIndex  # trigram candidate index: prunes keywords before fuzzy scoring
 
 try:
     from rapidfuzz import fuzz as rf_fuzz
@@ -493,24 +710,9 @@ except Exception:
     from fuzzywuzzy import fuzz as fw_fuzz
     _USE_RAPIDFUZZ = False
 
-_ARABIC_CHAR_MAP = str.maketrans({
-    "إ":"ا","أ":"ا","آ":"ا","ى":"ي","ئ":"ي","ؤ":"و","ة":"ه","ٱ":"ا","ٰ":""  # dagger alef
-})
-
-def _strip_diacritics(s: str) -> str:
-    return "".join(ch for ch in unicodedata.normalize("NFD", s) if unicodedata.category(ch) != "Mn")
-
 def _norm_ar(s: str) -> str:
-    if not isinstance(s, str):
-        s = "" if s is None else str(s)
-    s = s.strip()
-    s = _strip_diacritics(s)
-    s = s.replace("ـ", "")                   # tatweel
-    s = s.translate(_ARABIC_CHAR_MAP)        # alef/ya/ta marbuta unification
-    s = re.sub(r"\s+", " ", s)               # collapse spaces
-    s = re.sub(r"[^\w\s]", " ", s)           # drop punctuation
-    s = re.sub(r"\s+", " ", s).strip()
-    return s.lower()
+    # diacritics/tatweel/alef-ya-ta folding, digits, punctuation -> space, lowercase
+    return normalize(s, punct=True)
 
 def _score(a: str, b: str) -> float:
     if _USE_RAPIDFUZZ:
@@ -614,9 +816,27 @@ def get_worksheet_data_and_indices_safely(worksheet, expected_headers: List[str]
 
 from typing import List, Tuple
 from fuzzywuzzy import fuzz, process
+import numpy as np
 import os
 import time
 
+from fuzzywuzzy import utils as fw_utils
+
+try:
+    # batch scoring: one cdist call over all rows x keywords, on all cores
+    from rapidfuzz import process as rf_process, fuzz as rf_fuzz, utils as rf_utils
+except Exception:
+    rf_process = None
+
+from keyword_registry import REGISTRY  # keyword sources loaded/compiled once, rebuilt only when their content changes
+from tender_store import delete_row_ranges, contiguous_ranges  # bottom-up deleteDimension batches
+from gspread.utils import rowcol_to_a1
+from config import DELETE_REWRITE_RATIO
+
+def _fuzzy_process(s):
+    # same preprocessing the scorers apply (lowercase, punctuation -> space), for the trigram index
+    return rf_utils.default_process(s) if rf_process is not None else fw_utils.full_process(s, force_ascii=False)
+
 def fuzzy_match_keywords(text: str, keywords: List[str], threshold: int = 90) -> Tuple[bool, str, int]:
     """
     Return (is_match, best_keyword, score) using token_set_ratio.
@@ -627,24 +847,111 @@ def fuzzy_match_keywords(text: str, keywords: List[str], threshold: int = 90) ->
     best_kw, score = process.extractOne(text, keywords, scorer=fuzz.token_set_ratio)
     return (score >= threshold), best_kw, score
 
+def batch_best_scores(texts: List[str], keywords: List[str], threshold: int = 0, workers: int = -1,
+                      index: TrigramIndex = None, choices: List[str] = None) -> np.ndarray:
+    """
+    Best token_set_ratio per text against all keywords (same scores as fuzzy_match_keywords).
+    Texts are processed once per distinct value, then rapidfuzz.process.cdist builds the
+    distinct-texts x keywords matrix in one call (workers=-1: all cores). Scores are rounded to
+    integers the way fuzzywuzzy rounds them (89.66 -> 90), so the cutoff is threshold - 0.5:
+    anything that rounds below `threshold` comes back as 0 (score_cutoff lets rapidfuzz skip it early).
+    index: TrigramIndex(keywords, normalize=_fuzzy_process); each text is scored only against
+    its candidate keywords instead of the full matrix (for long keyword lists).
+    choices: keywords already processed with rf_utils.default_process (e.g. KeywordSet.processed).
+    """
+    uniq = {}
+    idx = np.array([uniq.setdefault((t or "").strip(), len(uniq)) for t in texts], dtype=np.int64)
+    if not uniq or not keywords:
+        return np.zeros(len(texts), dtype=np.uint8)
+    queries = [rf_utils.default_process(t) for t in uniq]
+    cutoff = min(100, max(0, threshold - 0.5))
+    if index is not None:
+        best = np.zeros(len(queries), dtype=np.uint8)
+        for qi, q in enumerate(queries):
+            for ki in index.candidates(q, normalized=True):
+                score = int(round(rf_fuzz.token_set_ratio(q, index.normalized[ki], score_cutoff=cutoff)))
+                best[qi] = max(best[qi], score)
+        best[best < threshold] = 0
+        return best[idx]
+    if choices is None:
+        choices = [rf_utils.default_process(k) for k in keywords]
+    matrix = rf_process.cdist(queries, choices, scorer=rf_fuzz.token_set_ratio, processor=None,
+                              score_cutoff=cutoff, dtype=np.float32, workers=workers)
+    best = np.rint(matrix.max(axis=1)).astype(np.uint8)   # half to even, like round() in fuzzywuzzy
+    best[best < threshold] = 0   # x.5 exactly passes the cutoff but can round down below threshold
+    return best[idx]
+
+# near-threshold pairs (raw scores that round up, down, or sit on .5): batch scores must equal the per-row path
+_PARITY_PAIRS = [
+    ("innovationchallengeprogram2025xx", "innovationchallengeprogram"),   # 89.66 -> 90
+    ("تنظيم فعاليات الابتكار", "فعاليات ابتكار"),                          # 77.78 -> 78
+    ("annual innovation award ceremony", "innovation awards"),           # 74.07 -> 74
+    ("hackathon events", "hackthon event"),                              # 93.33 -> 93
+    ("awards", "award 2025"),                                            # 62.5 -> 62 (half to even)
+]
+
+def check_batch_parity(pairs=_PARITY_PAIRS):
+    """batch_best_scores (cdist and pruned paths) vs fuzzy_match_keywords at each pair's own score +-1."""
+    if rf_process is None:
+        return
+    for text, kw in pairs:
+        expected = fuzzy_match_keywords(text, [kw], 0)[2]
+        for threshold in (expected - 1, expected, min(expected + 1, 100)):
+            index = TrigramIndex([kw], normalize=_fuzzy_process, min_overlap=0.0)
+            for got in (batch_best_scores([text], [kw], threshold)[0],
+                        batch_best_scores([text], [kw], threshold, index=index)[0]):
+                want = expected if expected >= threshold else 0
+                assert got == want, f"batch score {got} != per-row {want} for {text!r} / {kw!r} at {threshold}"
+
+check_batch_parity()
+
+def _rewrite_kept_rows(worksheet, rows, headers, rows_to_delete):
+    """Write the kept rows back from A2 (one update), then delete the now-unused tail rows (one range)."""
+    drop = set(rows_to_delete)
+    kept = [[row.get(h, "") for h in headers] for row in rows if row["original_row_number"] not in drop]
+    if kept:
+        worksheet.batch_update([{"range": f"A2:{rowcol_to_a1(len(kept) + 1, len(headers))}", "values": kept}],
+                               value_input_option="RAW")
+    delete_row_ranges(worksheet, range(len(kept) + 2, len(rows) + 2))
+
 def filter_and_delete_rows(
     worksheet,
     keywords_file: str,
     target_columns: List[str] = None,
     similarity_threshold: int = 90,
-    dry_run: bool = True
+    dry_run: bool = True,
+    batch: bool = True,
+    prune: bool = False,
+    min_overlap: float = None,
+    keyword_sources: tuple = (),
+    strategy: str = "auto"
 ):
     """
     Filter rows by checking if any of target_columns fuzzy-matches any keyword.
     Rows without a match are deleted (unless dry_run=True).
+    batch=True (needs rapidfuzz): keep/delete comes from one rows x keywords score matrix
+    per column instead of a fuzzy_match_keywords call per row.
+    prune=True: a trigram index sends each text only to keywords sharing at least `min_overlap`
+    of their trigrams (default config.NGRAM_MIN_OVERLAP); pruning stats are printed.
+    keyword_sources: extra keyword lists or .txt/.pdf paths merged after keywords_file
+    (e.g. CFG_KEYWORDS, "/content/keywords.pdf"). Keywords and their matcher structures come
+    from keyword_registry.REGISTRY: unchanged sources are neither re-read nor re-compiled.
+    strategy: how rows are removed (no per-row delete_rows / sleep):
+      "ranges"  - row numbers merged into contiguous ranges, deleted bottom-up via batchUpdate deleteDimension
+      "rewrite" - kept rows written back from A2 in one update, then the leftover tail deleted in one range
+      "auto"    - "rewrite" when more than DELETE_REWRITE_RATIO of the rows go and the header row is unique,
+                  else "ranges". Rewrite writes the read values back as RAW text (no re-parsing of refs,
+                  dates or numbers) and leaves formatting in place.
     """
     if target_columns is None:
         target_columns = ["النشاط الاساسي"]
 
-    # Load keywords
+    # Load keywords (cached per source mtime/content hash)
     if not os.path.exists(keywords_file):
         raise FileNotFoundError(f"Keywords file not found: {keywords_file}")
-    keywords = read_keywords_from_file(keywords_file)
+    kwset = REGISTRY.get(keywords_file, *keyword_sources)
+    keywords = kwset.keywords
+    print(REGISTRY.summary())
     if not keywords:
         print("No keywords loaded.")
         return
@@ -664,18 +971,39 @@ def filter_and_delete_rows(
     if missing_cols:
         print(f"Warning: target columns missing in sheet: {missing_cols}")
 
+    index = None
+    if prune:
+        kw_args = {} if min_overlap is None else {"min_overlap": min_overlap}
+        index = kwset.trigram_index(normalize=_fuzzy_process, **kw_args)
+
     rows_to_delete = []
-    for row in rows:
-        keep = False
+    if batch and rf_process is not None:
+        t0 = time.time()
+        keep = np.zeros(len(rows), dtype=bool)
         for col in target_columns:
-            if col in row:
-                val = row.get(col, "")
-                is_match, best_kw, score = fuzzy_match_keywords(val, keywords, similarity_threshold)
-                if is_match:
-                    keep = True
-                    break
-        if not keep:
-            rows_to_delete.append(row["original_row_number"])
+            if col in (headers or []):
+                texts = [row.get(col, "") for row in rows]
+                best = batch_best_scores(texts, keywords, similarity_threshold, index=index,
+                                         choices=kwset.processed(rf_utils.default_process))
+                keep |= (best >= similarity_threshold) & np.array([bool((t or "").strip()) for t in texts])
+        rows_to_delete = [row["original_row_number"] for row, k in zip(rows, keep) if not k]
+        print(f"Batch scoring: {len(rows)} rows x {len(keywords)} keywords in {time.time() - t0:.2f}s")
+    else:
+        for row in rows:
+            keep = False
+            for col in target_columns:
+                if col in row:
+                    val = row.get(col, "")
+                    cands = keywords if index is None else [keywords[i] for i in index.candidates(val)]
+                    is_match, best_kw, score = fuzzy_match_keywords(val, cands, similarity_threshold)
+                    if is_match:
+                        keep = True
+                        break
+            if not keep:
+                rows_to_delete.append(row["original_row_number"])
+
+    if index is not None:
+        print(index.summary())
 
     print("\n=== SUMMARY ===")
     print(f"Total rows: {len(rows)}")
@@ -686,6 +1014,7 @@ def filter_and_delete_rows(
         print("\n=== DRY RUN ===")
         if rows_to_delete:
             print(f"Rows that would be deleted (desc): {sorted(rows_to_delete, reverse=True)}")
+            print(f"= {len(contiguous_ranges(rows_to_delete))} contiguous ranges")
         else:
             print("No rows would be deleted.")
         return
@@ -694,17 +1023,18 @@ def filter_and_delete_rows(
         print("No rows to delete.")
         return
 
-    # Perform deletions (descending order to keep indices stable)
-    deleted = 0
-    for r in sorted(rows_to_delete, reverse=True):
-        try:
-            worksheet.delete_rows(r)
-            deleted += 1
-            time.sleep(0.8)  # rate limit safety
-        except Exception as e:
-            print(f"Error deleting row {r}: {e}")
+    if strategy == "auto":
+        can_rewrite = bool(headers) and len(set(headers)) == len(headers)
+        strategy = "rewrite" if can_rewrite and len(rows_to_delete) > DELETE_REWRITE_RATIO * len(rows) else "ranges"
+    t0 = time.time()
+    if strategy == "rewrite":
+        _rewrite_kept_rows(worksheet, rows, headers, rows_to_delete)
+        print(f"Rewrote {len(rows) - len(rows_to_delete)} kept rows in {time.time() - t0:.2f}s")
+    else:
+        ranges = delete_row_ranges(worksheet, rows_to_delete)
+        print(f"Deleted {len(ranges)} contiguous ranges in {time.time() - t0:.2f}s")
 
-    print(f"\nDeleted {deleted} of {len(rows_to_delete)} rows.")
+    print(f"\nDeleted {len(rows_to_delete)} rows ({strategy}).")
 
 import os
 from config import SHEET_ID as CFG_SHEET_ID, SHEET_TAB as CFG_SHEET_TAB, KEYWORDS as CFG_KEYWORDS
@@ -807,31 +1137,35 @@ if pdf_text_data is not None:
 else:
     print("Failed to read PDF content.")
 
-# Read data directly from Google Sheet (OAuth)
-from google.colab import auth
-auth.authenticate_user()
-
-import gspread
-from google.auth import default
+# Read data: local SQLite store when it has rows (no Sheets round-trip), else directly from Google Sheet (OAuth)
 import pandas as pd
 import numpy as np
 import re
 
-SHEET_ID = "1d2js0tZAIUzmVnKwlBHjr3NEvCLfsl6urEhKScXyPME"  # Ghofranai
-SHEET_TAB = "Sheet1"  # change if needed
+if "STORE" in globals() and STORE.count() > 0:
+    data = STORE.to_dataframe(SCHEMA).fillna("")
+else:
+    from google.colab import auth
+    auth.authenticate_user()
 
-creds, _ = default()
-gc = gspread.authorize(creds)
-wb = gc.open_by_key(SHEET_ID)
-ws = wb.worksheet(SHEET_TAB) if SHEET_TAB in [w.title for w in wb.worksheets()] else wb.sheet1
+    import gspread
+    from google.auth import default
+
+    SHEET_ID = "1d2js0tZAIUzmVnKwlBHjr3NEvCLfsl6urEhKScXyPME"  # Ghofranai
+    SHEET_TAB = "Sheet1"  # change if needed
+
+    creds, _ = default()
+    gc = gspread.authorize(creds)
+    wb = gc.open_by_key(SHEET_ID)
+    ws = wb.worksheet(SHEET_TAB) if SHEET_TAB in [w.title for w in wb.worksheets()] else wb.sheet1
 
-vals = ws.get_all_values()
-if not vals or len(vals) < 1:
-    raise ValueError("Sheet appears empty.")
+    vals = ws.get_all_values()
+    if not vals or len(vals) < 1:
+        raise ValueError("Sheet appears empty.")
 
-headers = vals[0]
-rows = vals[1:]
-data = pd.DataFrame(rows, columns=headers)
+    headers = vals[0]
+    rows = vals[1:]
+    data = pd.DataFrame(rows, columns=headers)
 
 # Optional: normalize common header variants into the new schema
 rename_map = {
@@ -895,7 +1229,6 @@ import warnings
 import re
 from matplotlib.font_manager import FontProperties
 import io
-import unicodedata
 
 warnings.filterwarnings('ignore')
 
@@ -924,26 +1257,8 @@ def _prepare_arabic_text(text):
     bidi_text = get_display(reshaped_text)
     return bidi_text
 
-# Minimal Arabic normalization for grouping/keys
-_ARABIC_MAP = str.maketrans({
-    "أ": "ا", "إ": "ا", "آ": "ا",
-    "ى": "ي", "ي": "ي",
-    "ة": "ه",
-    "ؤ": "و", "ئ": "ي",
-})
-_ARABIC_DIACRITICS = {chr(c) for c in range(0x0610, 0x061B+1)} | {chr(c) for c in range(0x064B, 0x065F+1)}
-
-def _strip_diacritics(s: str) -> str:
-    return "".join(ch for ch in s if ch not in _ARABIC_DIACRITICS)
-
-def _normalize_arabic(s):
-    if not isinstance(s, str):
-        return s
-    s = unicodedata.normalize("NFKC", s)
-    s = _strip_diacritics(s)
-    s = s.translate(_ARABIC_MAP)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+# Arabic normalization for grouping/keys: shared module (one translate pass, distinct values only)
+from arabic_norm import normalize_series
 
 # --- 3. REPORTLAB STYLES ---
 styles = getSampleStyleSheet()
@@ -997,7 +1312,7 @@ class TenderDataAnalyzer:
         for col in ['النشاط الاساسي', 'النشاط الأساسي', 'العنوان']:
             if col in self.df.columns:
                 new_col = f'{col}_normalized'
-                self.df[new_col] = self.df[col].apply(_normalize_arabic)
+                self.df[new_col] = normalize_series(self.df[col], lower=False)
 
         return self.df
 
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+عملاء Google API مشتركة على مستوى العملية (Sheets / Drive / Gmail):
+  - الاعتماد يُحمَّل مرة واحدة (credentials.json + token.json)، ويُعاد استخدامه لأي طلب تغطي صلاحياته
+    الصلاحيات المطلوبة (اعتماد Drive+Sheets يخدم Sheets أيضاً)
+  - التوكن يُجدَّد قبل انتهائه بـ GOOGLE_TOKEN_REFRESH_MARGIN ثانية ويُحفظ في token.json
+  - العميل (build) يُبنى عند أول طلب فقط، من وثيقة discovery المرفقة بالمكتبة (لا تنزيل عبر الشبكة)
+    أو من كاش في الذاكرة مع الإصدارات القديمة
+الاستخدام:
+    sheets = service("sheets", "v4", ["https://www.googleapis.com/auth/spreadsheets"]).spreadsheets()
+ملاحظة: كائنات العميل (httplib2) ليست آمنة بين الخيوط؛ الاستخدام الحالي من خيط واحد.
+"""
+import os
+import json
+import pickle
+import threading
+from datetime import datetime, timedelta
+
+from googleapiclient.discovery import build
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google.oauth2.service_account import Credentials as SA_Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+from config import GOOGLE_CREDENTIALS_FILE, GOOGLE_TOKEN_FILE, GOOGLE_TOKEN_REFRESH_MARGIN
+
+_lock = threading.RLock()
+_creds = {}      # frozenset(scopes) -> credentials
+_services = {}   # (api, version, id(credentials)) -> resource
+
+
+class _DiscoveryCache:
+    # لإصدارات googleapiclient التي لا ترفق وثائق discovery: تُنزَّل مرة واحدة لكل عملية
+    def __init__(self):
+        self._docs = {}
+
+    def get(self, url):
+        return self._docs.get(url)
+
+    def set(self, url, content):
+        self._docs[url] = content
+
+
+_DISCOVERY = _DiscoveryCache()
+
+
+def _read_token(scopes):
+    if not os.path.exists(GOOGLE_TOKEN_FILE):
+        return None
+    try:
+        return Credentials.from_authorized_user_file(GOOGLE_TOKEN_FILE, scopes)
+    except (ValueError, UnicodeDecodeError):
+        # token.json قديم محفوظ بـ pickle
+        try:
+            with open(GOOGLE_TOKEN_FILE, "rb") as t:
+                return pickle.load(t)
+        except Exception as e:
+            print(f"⚠️ Error loading {GOOGLE_TOKEN_FILE}: {e}")
+            return None
+
+
+def _save_token(creds):
+    if isinstance(creds, Credentials):
+        with open(GOOGLE_TOKEN_FILE, "w", encoding="utf-8") as t:
+            t.write(creds.to_json())
+
+
+def _load(scopes, console):
+    if not os.path.exists(GOOGLE_CREDENTIALS_FILE):
+        raise FileNotFoundError(f"{GOOGLE_CREDENTIALS_FILE} غير موجود في المسار الحالي.")
+    with open(GOOGLE_CREDENTIALS_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Service Account
+    if isinstance(data, dict) and data.get("type") == "service_account" and data.get("client_email"):
+        return SA_Credentials.from_service_account_file(GOOGLE_CREDENTIALS_FILE, scopes=scopes)
+
+    # OAuth Client
+    creds = _read_token(scopes)
+    if creds and (creds.valid or creds.refresh_token):
+        return creds
+    flow = InstalledAppFlow.from_client_secrets_file(GOOGLE_CREDENTIALS_FILE, scopes)
+    # كولاب لا يفتح متصفحاً: console=True لتدفق النسخ واللصق
+    creds = flow.run_console() if console else flow.run_local_server(port=0)
+    _save_token(creds)
+    return creds
+
+
+def _fresh(creds):
+    """يجدّد التوكن إن انتهى أو اقترب انتهاؤه (expiry بتوقيت UTC بلا منطقة في google-auth)."""
+    margin = timedelta(seconds=GOOGLE_TOKEN_REFRESH_MARGIN)
+    if creds.valid and not (creds.expiry and creds.expiry - datetime.utcnow() < margin):
+        return creds
+    if isinstance(creds, Credentials) and not creds.refresh_token:
+        return None
+    creds.refresh(Request())
+    _save_token(creds)
+    return creds
+
+
+def credentials(scopes, console=False):
+    """اعتماد صالح يغطي scopes: المخزَّن إن وُجد (بعد تجديده عند الحاجة)، وإلا يُحمَّل مرة واحدة."""
+    need = frozenset(scopes)
+    with _lock:
+        for have, creds in list(_creds.items()):
+            if need <= have:
+                if _fresh(creds) is not None:
+                    return creds
+                # لا يمكن تجديده: يُسقط مع عملائه ويُحمَّل من جديد
+                del _creds[have]
+                for key in [k for k in _services if k[2] == id(creds)]:
+                    del _services[key]
+        creds = _fresh(_load(sorted(need), console))
+        if creds is None:
+            raise RuntimeError("تعذّر تجديد التوكن: احذف token.json وأعد تسجيل الدخول.")
+        _creds[need] = creds
+        return creds
+
+
+def service(api, version, scopes, console=False):
+    """عميل API مخزَّن لكل (api, version, اعتماد)؛ يُبنى عند أول طلب فقط."""
+    with _lock:
+        creds = credentials(scopes, console)
+        key = (api, version, id(creds))
+        svc = _services.get(key)
+        if svc is None:
+            try:
+                svc = build(api, version, credentials=creds, cache_discovery=False, static_discovery=True)
+            except TypeError:
+                # googleapiclient < 2.0 (بلا static_discovery)
+                svc = build(api, version, credentials=creds, cache=_DISCOVERY)
+            _services[key] = svc
+        return svc
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+طلبات "محوّطة" (hedged) عبر مرايا اعتماد (tenders.etimad.sa / portal.etimad.sa):
+  - يُرسل الطلب إلى المضيف الأساسي، فإن لم يرد خلال ميزانية زمنية يُرسل نفس الطلب إلى المرآة التالية
+  - أول رد سليم يفوز؛ الطلبات المتأخرة تكمل في الخلفية وتُسجَّل أزمنتها فقط
+  - المضيف الأساسي والميزانية يحددهما مدرَّج أزمنة الاستجابة لكل مضيف (لا ترتيب ثابت)
+الاستخدام:
+    base, r = HEDGER.get(LIST_PAGES, lambda base: session.get(base, ...))
+"""
+import time
+import threading
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from config import HEDGE_DELAY, HEDGE_MIN_DELAY, HEDGE_MAX_DELAY, HEDGE_QUANTILE
+
+# حدود الخانات (ثوانٍ): تصاعد هندسي من 50ms حتى ~60s
+_BOUNDS = [0.05 * 2 ** (i / 2) for i in range(21)]
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.total = 0
+
+    def record(self, seconds):
+        self.counts[bisect_left(_BOUNDS, seconds)] += 1
+        self.total += 1
+
+    def quantile(self, q):
+        """الحد الأعلى للخانة التي تقع فيها النسبة q (تقدير محافظ)؛ None إن لم توجد عينات."""
+        if not self.total:
+            return None
+        need, acc = q * self.total, 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= need:
+                return _BOUNDS[i] if i < len(_BOUNDS) else _BOUNDS[-1] * 2
+        return _BOUNDS[-1] * 2
+
+
+class HedgedFetcher:
+    def __init__(self, delay=HEDGE_DELAY, min_delay=HEDGE_MIN_DELAY, max_delay=HEDGE_MAX_DELAY,
+                 quantile=HEDGE_QUANTILE, workers=4):
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.quantile = quantile
+        self._hist = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self.counters = {"requests": 0, "hedged": 0, "wins": {}}
+
+    def _histogram(self, base):
+        # يُستدعى والقفل محجوز
+        host = urlparse(base).netloc or base
+        return self._hist.setdefault(host, LatencyHistogram())
+
+    def _estimate(self, base, q):
+        with self._lock:
+            v = self._histogram(base).quantile(q)
+        return self.delay if v is None else v
+
+    def ranked(self, bases):
+        """المرايا مرتبة بالوسيط (p50) الأسرع أولاً؛ بلا عينات = HEDGE_DELAY، والتعادل يحفظ الترتيب الأصلي."""
+        return sorted(bases, key=lambda b: self._estimate(b, 0.5))
+
+    def budget(self, base):
+        """مهلة انتظار الأساسي قبل التحويط: p(HEDGE_QUANTILE) له ضمن [HEDGE_MIN_DELAY, HEDGE_MAX_DELAY]."""
+        return min(self.max_delay, max(self.min_delay, self._estimate(base, self.quantile)))
+
+    def _timed(self, base, fetch):
+        t = time.monotonic()
+        try:
+            return fetch(base)
+        finally:
+            # الفشل يُسجَّل بزمنه أيضاً: مضيف يفشل ببطء يتأخر في الترتيب
+            elapsed = time.monotonic() - t
+            with self._lock:
+                self._histogram(base).record(elapsed)
+
+    def get(self, bases, fetch):
+        """
+        fetch(base) يعيد الرد أو يرفع استثناء عند الفشل. يعيد (base الفائز, الرد)،
+        أو يرفع آخر استثناء إن فشلت كل المرايا.
+        """
+        order = self.ranked(bases)
+        with self._lock:
+            self.counters["requests"] += 1
+        if len(order) == 1:
+            return order[0], self._timed(order[0], fetch)
+
+        f = self._pool.submit(self._timed, order[0], fetch)
+        owner, pending, launched, errors = {f: order[0]}, {f}, 1, []
+        while pending or launched < len(order):
+            can_hedge = launched < len(order)
+            done, pending = wait(pending, timeout=self.budget(order[0]) if can_hedge else None,
+                                 return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    r = f.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                with self._lock:
+                    wins = self.counters["wins"]
+                    wins[owner[f]] = wins.get(owner[f], 0) + 1
+                return owner[f], r
+            # انتهت الميزانية دون رد، أو فشلت كل الطلبات الجارية: أرسل إلى المرآة التالية
+            if can_hedge and (not done or not pending):
+                nxt = order[launched]
+                launched += 1
+                with self._lock:
+                    self.counters["hedged"] += 1
+                f = self._pool.submit(self._timed, nxt, fetch)
+                owner[f] = nxt
+                pending.add(f)
+        raise errors[-1] if errors else RuntimeError("no mirror answered")
+
+    def summary(self):
+        with self._lock:
+            hosts = {h: (hist.quantile(0.5), hist.quantile(self.quantile), hist.total) for h, hist in self._hist.items()}
+            c = dict(self.counters, wins=dict(self.counters["wins"]))
+        parts = [f"{h}: p50 {p50:.2f}s p{int(self.quantile * 100)} {pq:.2f}s n={n}"
+                 for h, (p50, pq, n) in hosts.items() if n]
+        return f"Hedged fetch | {c['requests']} req, {c['hedged']} hedged, wins {c['wins']} | " + " ; ".join(parts)
+
+
+# نسخة مشتركة: المدرَّجات تتراكم عبر الصفحات والتشغيلات داخل نفس العملية
+HEDGER = HedgedFetcher()
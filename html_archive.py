@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+أرشيف HTML خام مضغوط وإلحاقي (append-only) لكل صفحة جُلبت من اعتماد.
+  - ملف بيانات لكل يوم  <ARCHIVE_DIR>/YYYY-MM-DD.bin : سجلات مضغوطة متتالية (zstd إن توفرت zstandard، وإلا zlib)
+  - فهرس              <ARCHIVE_DIR>/index.jsonl     : سطر لكل سجل {url, fetched_at, segment, offset, length, codec, meta}
+    (الصفحة غير المتغيرة (304) سطر فهرس فقط يشير إلى بيانات آخر نسخة منها، meta.unchanged=True)
+يسمح بإعادة التحليل (reparse) من القرص دون أي اتصال بالشبكة.
+"""
+import os
+import json
+import zlib
+import threading
+from datetime import datetime
+
+try:
+    import zstandard
+    _CODEC = "zstd"
+except Exception:
+    zstandard = None
+    _CODEC = "zlib"
+
+from config import ARCHIVE_DIR
+
+
+def _compress(data):
+    if _CODEC == "zstd":
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+def _decompress(codec, blob):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("السجل مضغوط بـ zstd لكن حزمة zstandard غير مثبتة.")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class HtmlArchive:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+        self._last = None   # url -> آخر سجل (يُقرأ من الفهرس عند أول حاجة)
+        os.makedirs(root, exist_ok=True)
+
+    def append(self, url, html, meta=None, fetched_at=None, unchanged=False):
+        """
+        unchanged=True (رد 304): سطر فهرس بتاريخ هذا الجلب يشير إلى بيانات آخر سجل للرابط بدل نسخة مكررة،
+        فكل يوم جُلبت فيه الصفحة له سجل في الفهرس (reparse بنطاق تواريخ يجدها). إن لم يُؤرشف الرابط من قبل تُحفظ الصفحة.
+        """
+        fetched_at = fetched_at or datetime.now()
+        with self._lock:
+            if self._last is None:
+                self._last = {e["url"]: e for e in self.entries()}
+            prev = self._last.get(url) if unchanged else None
+            if prev is not None:
+                segment, offset, length, codec = prev["segment"], prev["offset"], prev["length"], prev["codec"]
+                meta = dict(meta or {}, unchanged=True)
+            else:
+                codec, blob = _compress(html.encode("utf-8"))
+                segment = fetched_at.strftime("%Y-%m-%d") + ".bin"
+                with open(os.path.join(self.root, segment), "ab") as f:
+                    offset = f.tell()
+                    f.write(blob)
+                length = len(blob)
+            entry = {
+                "url": url,
+                "fetched_at": fetched_at.isoformat(timespec="seconds"),
+                "segment": segment,
+                "offset": offset,
+                "length": length,
+                "codec": codec,
+                "meta": meta or {},
+            }
+            # السجل يُكتب قبل الفهرس: سطر فهرس موجود يعني بيانات كاملة
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._last[url] = entry
+        return entry
+
+    def entries(self, since=None, until=None):
+        """سجلات الفهرس بترتيب الجلب؛ since/until نصوص ISO (YYYY-MM-DD أو مع الوقت)."""
+        if not os.path.exists(self.index_path):
+            return []
+        out = []
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue  # سطر مبتور من عملية انقطعت
+                if since and e["fetched_at"] < since:
+                    continue
+                if until and e["fetched_at"][:len(until)] > until:  # until شامل لليوم كاملاً
+                    continue
+                out.append(e)
+        return out
+
+    def read(self, entry):
+        return read_entry(self.root, entry)
+
+
+def read_entry(root, entry):
+    """قراءة سجل واحد (دالة مستقلة لتُستدعى من عمليات reparse المتوازية)."""
+    with open(os.path.join(root, entry["segment"]), "rb") as f:
+        f.seek(entry["offset"])
+        blob = f.read(entry["length"])
+    return _decompress(entry["codec"], blob).decode("utf-8")
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+كاش HTTP على القرص يدعم الطلبات الشرطية (ETag / Last-Modified).
+كل رابط يُخزَّن في ملف JSON واحد: الترويسات + نص الصفحة + (اختيارياً) البطاقات المستخرجة منها،
+فإذا ردّ الخادم 304 نعيد المحتوى المخزَّن ونتخطى التحليل بالكامل.
+"""
+import os
+import json
+import hashlib
+
+from config import HTTP_CACHE_DIR
+
+
+class HttpCache:
+    def __init__(self, root=HTTP_CACHE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.root, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, url):
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, url, entry):
+        path = self._path(url)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def conditional_headers(self, url):
+        """ترويسات If-None-Match / If-Modified-Since للنسخة المخزنة (إن وُجدت)."""
+        entry = self.load(url)
+        if not entry:
+            return {}
+        h = {}
+        if entry.get("etag"):
+            h["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            h["If-Modified-Since"] = entry["last_modified"]
+        return h
+
+    def forget(self, url):
+        try:
+            os.remove(self._path(url))
+        except OSError:
+            pass
+
+    def store(self, url, headers, body):
+        """
+        يحفظ نسخة جديدة؛ البطاقات المخزنة سابقاً تُسقط لأنها تخص نسخة قديمة.
+        رد بلا ETag ولا Last-Modified لا يُخزَّن، ويحذف النسخة السابقة: مُعرّفاتها لم تعد تصف الصفحة الحالية
+        (وإلا لأُلحقت بطاقات الصفحة الجديدة بها، وأعاد 304 لاحقاً المحتوى القديم).
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            self.forget(url)
+            return
+        self._write(url, {"url": url, "etag": etag, "last_modified": last_modified, "body": body, "items": None})
+
+    def store_items(self, url, items):
+        entry = self.load(url)
+        if entry is None:
+            return
+        entry["items"] = items
+        self._write(url, entry)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+مطابقة الكلمات المفتاحية بآلة Aho-Corasick تُبنى مرة واحدة من الكلمات بعد التوحيد:
+كل نص يُمسح مرة واحدة (حرفاً حرفاً) ويُعاد ما طابقه من الكلمات الأصلية، فكلفة الفلترة
+لا تزيد بزيادة عدد الكلمات. المطابقة جزئية (substring) كما في _kw_ok / matches_any سابقاً.
+    m = KeywordMatcher(AR_KW + EN_KW)
+    m.any(text) / m.find(text) / m.mask_column(df["اسم المنافسة"])
+"""
+from arabic_norm import normalize as _norm
+
+
+class KeywordMatcher:
+    def __init__(self, keywords, normalize=_norm):
+        self.normalize = normalize
+        self.keywords = list(keywords)
+        # الحالة 0 هي الجذر؛ لكل حالة: انتقالات، رابط فشل، والكلمات الأصلية المنتهية عندها (مع مخرجات روابط الفشل)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for kw in self.keywords:
+            n = normalize(kw)
+            if not n:
+                continue
+            state = 0
+            for ch in n:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            if kw not in self._out[state]:
+                self._out[state] += (kw,)
+        self._build_links()
+
+    def _build_links(self):
+        # BFS: رابط فشل كل حالة = أطول لاحقة لها هي أيضاً بادئة لكلمة، ومخرجاتها تُضم إليها
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += tuple(k for k in self._out[self._fail[nxt]] if k not in self._out[nxt])
+                queue.append(nxt)
+
+    def _scan(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in self.normalize(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield out[state]
+
+    def any(self, text):
+        """هل يحتوي النص على أي كلمة؟ (يتوقف عند أول مطابقة)"""
+        for _ in self._scan(text):
+            return True
+        return False
+
+    def find(self, text):
+        """الكلمات الأصلية المطابقة بترتيب أول ظهور (بلا تكرار)."""
+        found = {}
+        for kws in self._scan(text):
+            for k in kws:
+                found.setdefault(k)
+        return list(found)
+
+    def match_column(self, values):
+        """
+        نسخة عمود كامل: القيم المتكررة تُمسح مرة واحدة. يعيد pandas.Series من قوائم الكلمات
+        بنفس الفهرس (أو بفهرس افتراضي إن لم تكن values سلسلة pandas).
+        """
+        import pandas as pd
+        s = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype="object")
+        s = s.fillna("").astype(str)
+        cache = {v: self.find(v) for v in s.unique()}
+        return s.map(cache)
+
+    def mask_column(self, values):
+        """مثل match_column لكن يعيد قناعاً منطقياً (صف مطابق = True) لفلترة DataFrame مباشرة."""
+        import pandas as pd
+        s = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype="object")
+        s = s.fillna("").astype(str)
+        cache = {v: self.any(v) for v in s.unique()}
+        return s.map(cache).astype(bool)
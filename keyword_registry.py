@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+سجل الكلمات المفتاحية: يحمّل المصادر (keywords.txt، config.KEYWORDS، قوائم مستخرجة من PDF) ويبني منها
+مرة واحدة بُنى المطابقة الموحّدة (KeywordMatcher، TrigramIndex، الكلمات بعد المعالجة)، مخزّنة بمفتاح
+تجزئة المحتوى. كل استدعاء يفحص الملفات بـ os.stat فقط: لا قراءة ما لم يتغير mtime/الحجم، ولا إعادة بناء
+ما لم يتغير المحتوى نفسه (لمس الملف دون تعديله لا يكلف شيئاً).
+    ks = REGISTRY.get("keywords.txt", config.KEYWORDS, "/content/keywords.pdf")
+    ks.keywords / ks.matcher / ks.trigram_index(...) / ks.processed(fn)
+"""
+import io
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import NGRAM_SIZE, NGRAM_MIN_OVERLAP
+from arabic_norm import normalize
+from keyword_matcher import KeywordMatcher
+from ngram_index import TrigramIndex
+
+_PDF_SPLIT = re.compile(r"[\n,،;؛]+")
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _text_keywords(data):
+    """ملف نصي: كلمة في كل سطر."""
+    return [line.strip() for line in data.decode("utf-8-sig").splitlines() if line.strip()]
+
+
+def _pdf_keywords(data):
+    """PDF: نص كل الصفحات، مقسوماً على الأسطر والفواصل."""
+    try:
+        import PyPDF2
+    except ImportError:
+        raise ImportError("قراءة الكلمات من PDF تحتاج PyPDF2 (pip install PyPDF2)")
+    parts = []
+    for page in PyPDF2.PdfReader(io.BytesIO(data)).pages:
+        try:
+            parts.append(page.extract_text() or "")
+        except Exception:
+            continue
+    return [w.strip() for w in _PDF_SPLIT.split("\n".join(parts)) if w.strip()]
+
+
+class KeywordSet:
+    """قائمة كلمات مجمّعة (بلا تكرار حرفي) مع بُنى المطابقة، كل بنية تُبنى عند أول طلب فقط."""
+
+    def __init__(self, keywords, key):
+        self.keywords = keywords
+        self.key = key
+        self._built = {}
+        self._lock = threading.Lock()
+
+    def _memo(self, name, build):
+        with self._lock:
+            if name not in self._built:
+                self._built[name] = build()
+            return self._built[name]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    @property
+    def matcher(self):
+        return self._memo("matcher", lambda: KeywordMatcher(self.keywords))
+
+    def trigram_index(self, normalize=normalize, n=NGRAM_SIZE, min_overlap=NGRAM_MIN_OVERLAP):
+        """الفهرس المخزّن لنفس المعاملات (عداداته تُصفَّر عند كل طلب لتعكس التشغيل الحالي)."""
+        index = self._memo(("trigram", normalize, n, min_overlap),
+                           lambda: TrigramIndex(self.keywords, normalize=normalize, n=n, min_overlap=min_overlap))
+        index.reset_stats()
+        return index
+
+    def processed(self, fn=normalize):
+        """الكلمات بعد fn (مثل معالج المقارنة التقريبية) بنفس الترتيب."""
+        return self._memo(("processed", fn), lambda: [fn(k) for k in self.keywords])
+
+
+class KeywordRegistry:
+    def __init__(self, max_sets=8):
+        self.max_sets = max_sets
+        self._files = {}                # path -> ((mtime_ns, size), digest, keywords)
+        self._sets = OrderedDict()      # content key -> KeywordSet (الأحدث استخداماً في النهاية)
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "compiles": 0, "hits": 0}
+
+    def _load_file(self, path):
+        st = os.stat(path)   # FileNotFoundError إن لم يوجد الملف
+        sig = (st.st_mtime_ns, st.st_size)
+        cached = self._files.get(path)
+        if cached and cached[0] == sig:
+            return cached[1], cached[2]
+        with open(path, "rb") as f:
+            data = f.read()
+        self.stats["reads"] += 1
+        digest = _digest(data)
+        if cached and cached[1] == digest:
+            words = cached[2]
+        else:
+            words = _pdf_keywords(data) if path.lower().endswith(".pdf") else _text_keywords(data)
+        self._files[path] = (sig, digest, words)
+        return digest, words
+
+    def get(self, *sources):
+        """
+        sources: مسارات (‎.txt / .pdf) أو قوائم كلمات (مثل config.KEYWORDS)، تُدمج بالترتيب.
+        يعيد KeywordSet المخزّن إن لم يتغير محتوى أي مصدر، وإلا يبني واحداً جديداً.
+        """
+        with self._lock:
+            digests, words = [], []
+            for src in sources:
+                if isinstance(src, (str, os.PathLike)):
+                    digest, kws = self._load_file(os.fspath(src))
+                else:
+                    kws = [str(k) for k in src if k is not None]
+                    digest = _digest("\n".join(kws).encode("utf-8"))
+                digests.append(digest)
+                words.extend(kws)
+            key = _digest("|".join(digests).encode("utf-8"))
+            ks = self._sets.get(key)
+            if ks is not None:
+                self.stats["hits"] += 1
+                self._sets.move_to_end(key)
+                return ks
+            # المكرر حرفياً فقط يُحذف: التوحيد (ة/ه، الألف...) يخص كل مستهلك، والمقارنة التقريبية
+            # (default_process) لا توحّد، فحذف "فعاليه" لأنها تساوي "فعالية" بعد التوحيد يغيّر النتيجة
+            seen, unique = set(), []
+            for w in words:
+                w = w.strip()
+                if w and w not in seen:
+                    seen.add(w)
+                    unique.append(w)
+            ks = self._sets[key] = KeywordSet(unique, key)
+            self.stats["compiles"] += 1
+            while len(self._sets) > self.max_sets:
+                self._sets.popitem(last=False)
+            return ks
+
+    def summary(self):
+        s = self.stats
+        return f"Keyword registry: {len(self._sets)} sets | {s['compiles']} compiled, {s['hits']} reused, {s['reads']} file reads"
+
+
+# نسخة مشتركة: الاستدعاءات المتكررة في نفس العملية (جلسة الدفتر، تشغيلات متتالية) تعيد استخدام المبني
+REGISTRY = KeywordRegistry()
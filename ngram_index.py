@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس مقلوب على مقاطع الحروف (trigrams) للكلمات المفتاحية بعد التوحيد، لتقليم المطابقة التقريبية:
+لكل نص لا يُرسل إلى المقارنة المكلفة (_score / token_set_ratio) إلا الكلمات التي يشترك معها في نسبة
+كافية من مقاطعها (min_overlap من مقاطع الكلمة نفسها). كلفة البحث تتبع مقاطع النص وقوائمها لا طول قائمة الكلمات.
+التقليم تقريبي: خفض min_overlap يقلل ما يُفوَّت ويزيد ما يُقارن؛ العدادات في stats / summary().
+"""
+import math
+from collections import defaultdict
+
+from config import NGRAM_SIZE, NGRAM_MIN_OVERLAP
+
+
+def ngrams(s, n=NGRAM_SIZE):
+    """مقاطع n حرفاً المميزة لنص موحّد، مع حشوة مسافة في الطرفين (فالكلمات القصيرة لها مقاطع أيضاً)."""
+    s = f" {s} "
+    return {s[i:i + n] for i in range(max(1, len(s) - n + 1))}
+
+
+class TrigramIndex:
+    def __init__(self, keywords, normalize=str, n=NGRAM_SIZE, min_overlap=NGRAM_MIN_OVERLAP):
+        self.keywords = list(keywords)
+        self.normalize = normalize
+        self.n = n
+        self.min_overlap = min_overlap
+        self.normalized = [normalize(k) for k in self.keywords]
+        self._postings = defaultdict(list)
+        self._need = []
+        for i, kw in enumerate(self.normalized):
+            grams = ngrams(kw, n) if kw else set()
+            for g in grams:
+                self._postings[g].append(i)
+            # أقل عدد مقاطع مشتركة لتصبح الكلمة مرشحة (مقطع واحد على الأقل)
+            self._need.append(max(1, math.ceil(len(grams) * min_overlap)) if grams else None)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"texts": 0, "pairs": 0, "candidates": 0}
+
+    def candidates(self, text, normalized=False):
+        """فهارس الكلمات المرشحة للنص (بترتيب القائمة الأصلية)."""
+        t = text if normalized else self.normalize(text)
+        counts = defaultdict(int)
+        if t:
+            for g in ngrams(t, self.n):
+                for i in self._postings.get(g, ()):
+                    counts[i] += 1
+        out = sorted(i for i, c in counts.items() if c >= self._need[i])
+        self.stats["texts"] += 1
+        self.stats["pairs"] += len(self.keywords)
+        self.stats["candidates"] += len(out)
+        return out
+
+    def summary(self):
+        s = self.stats
+        pruned = 1 - s["candidates"] / s["pairs"] if s["pairs"] else 0.0
+        return (f"Trigram index: {len(self.keywords)} keywords | {s['texts']} texts | "
+                f"scored {s['candidates']} of {s['pairs']} pairs (pruned {pruned:.1%}, min_overlap={self.min_overlap})")
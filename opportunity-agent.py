@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import csv
+import argparse
 
 # إضافة مسار هذا الملف إلى مسارات بايثون لضمان رؤية modules المجاورة (مثل scraper.py)
 HERE = os.path.dirname(os.path.abspath(__file__))
@@ -9,7 +11,7 @@ if HERE not in sys.path:
 
 # محاولة الاستيراد بالطريقة المعتادة
 try:
-    from scraper import scrape_opportunities
+    from scraper import iter_opportunity_batches, reparse_archive
 except ModuleNotFoundError:
     # خطة بديلة: تحميل scraper.py مباشرة من المسار الكامل
     import importlib.util
@@ -17,20 +19,41 @@ except ModuleNotFoundError:
     spec = importlib.util.spec_from_file_location("scraper", scr_path)
     scraper = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(scraper)
-    scrape_opportunities = scraper.scrape_opportunities
+    iter_opportunity_batches = scraper.iter_opportunity_batches
+    reparse_archive = scraper.reparse_archive
 
-from sheets_handler import update_sheet
-from config import KEYWORDS, SHEET_LINK
+from sheets_handler import update_sheet_stream
+from config import KEYWORDS, SHEET_LINK, SHEET_COLUMNS
 
-def main(headless=False):
-    items = scrape_opportunities(KEYWORDS, require_today=True, headless=headless)
-    if not items:
-        print("لا نتائج منشورة اليوم بالكلمات المحددة.")
+def main(headless=False, resume=False):
+    # headless غير مستخدم (للإتساق مع orchestrator)؛ كل دفعة تُكتب في الشيت فور تحليلها بينما يستمر الجلب
+    # resume=True يكمل من آخر نقطة استئناف لزحف اليوم بدل البدء من الصفر
+    added = update_sheet_stream(iter_opportunity_batches(KEYWORDS, require_today=True, resume=resume))
+    if not added:
+        print("لا نتائج جديدة منشورة اليوم بالكلمات المحددة.")
         print("الشيت:", SHEET_LINK)
         return
-    update_sheet(items)
-    print("تم تحديث Sheet1.")
+    print(f"تم تحديث Sheet1: {added} صف جديد.")
     print("الشيت:", SHEET_LINK)
 
+def reparse(since=None, until=None, out_path="data/reparsed.csv"):
+    # إعادة بناء النتائج من أرشيف HTML المحلي (بلا شبكة) وحفظها CSV
+    items = reparse_archive(since=since, until=until)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=SHEET_COLUMNS)
+        w.writeheader()
+        w.writerows(items)
+    print(f"تمت إعادة التحليل من الأرشيف: {len(items)} صف →", out_path)
+
 if __name__ == "__main__":
-    main(headless=False)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reparse", action="store_true", help="إعادة التحليل من الأرشيف المحلي دون شبكة")
+    ap.add_argument("--since", help="YYYY-MM-DD (مع --reparse)")
+    ap.add_argument("--until", help="YYYY-MM-DD (مع --reparse)")
+    ap.add_argument("--resume", action="store_true", help="إكمال زحف اليوم من آخر نقطة استئناف بعد انقطاع")
+    args = ap.parse_args()
+    if args.reparse:
+        reparse(since=args.since, until=args.until)
+    else:
+        main(headless=False, resume=args.resume)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+تخطيط استعلامات البحث: توحيد الكلمات المفتاحية وتجذيرها تجذيراً خفيفاً، ثم اختيار أقل مجموعة
+من عبارات البحث تغطي كل الكلمات (بحث اعتماد يطابق النص الجزئي، فـ"ابتكار" تغطي "الابتكار" و"ابتكارات").
+المطابقة الدقيقة بكل كلمة أصلية تتم محلياً على البطاقات المسترجعة.
+"""
+import re
+from functools import lru_cache
+
+from arabic_norm import normalize as _norm
+from keyword_matcher import KeywordMatcher
+
+# سوابق/لواحق شائعة تُجرّب لتوليد جذور مرشحة (لا نحذف إلا إن بقي ما يكفي من الحروف)
+_AR_PREFIXES = ("وال", "بال", "فال", "كال", "لل", "ال", "ي", "ن", "م", "ت")
+_AR_SUFFIXES = ("ات", "ون", "ين", "يه", "ه", "ي")
+_EN_SUFFIXES = ("ions", "ion", "ives", "ive", "ors", "or", "es", "s", "e")
+_MIN_STEM = 4
+
+
+def _stems(word):
+    """الكلمة الموحّدة + جذورها الخفيفة المرشحة (بعد حذف سابقة و/أو لاحقة واحدة)."""
+    out = {word}
+    is_ar = bool(re.search(r"[\u0600-\u06FF]", word))
+    prefixes = _AR_PREFIXES if is_ar else ()
+    suffixes = _AR_SUFFIXES if is_ar else _EN_SUFFIXES
+    heads = {word} | {word[len(p):] for p in prefixes if word.startswith(p) and len(word) - len(p) >= _MIN_STEM}
+    for h in heads:
+        out.add(h)
+        for suf in suffixes:
+            if h.endswith(suf) and len(h) - len(suf) >= _MIN_STEM:
+                out.add(h[:-len(suf)])
+    return out
+
+
+class QueryPlan:
+    def __init__(self, queries, n_keywords):
+        self.queries = queries          # [(search_term, [original keywords])]
+        self.n_keywords = n_keywords
+
+    @property
+    def saved(self):
+        return self.n_keywords - len(self.queries)
+
+    def summary(self):
+        return f"خطة البحث: {len(self.queries)} طلب بدلاً من {self.n_keywords} (تم توفير {self.saved})"
+
+
+def plan_queries(keywords):
+    """
+    يعيد QueryPlan بأقل عدد من عبارات البحث (تغطية جشعة للمجموعات).
+    العبارة t تغطي الكلمة k إذا كانت t جزءاً من k بعد التوحيد.
+    """
+    keywords = list(keywords)
+    norm_kw, order = {}, []
+    for kw in keywords:
+        n = _norm(kw)
+        if not n:
+            continue
+        if n not in norm_kw:
+            norm_kw[n] = []
+            order.append(n)
+        norm_kw[n].append(kw)
+
+    candidates = []
+    for n in order:
+        for c in sorted(_stems(n), key=len, reverse=True):
+            if c not in candidates:
+                candidates.append(c)
+    covers = {c: {n for n in order if c in n} for c in candidates}
+
+    uncovered, queries = set(order), []
+    while uncovered:
+        # الأكثر تغطية أولاً، ثم الأطول (أدق وأقل ضجيجاً)، ثم ترتيب الظهور
+        best = max(candidates, key=lambda c: (len(covers[c] & uncovered), len(c), -candidates.index(c)))
+        got = covers[best] & uncovered
+        members = [kw for n in order if n in got for kw in norm_kw[n]]
+        queries.append((best, members))
+        uncovered -= got
+    return QueryPlan(queries, len(keywords))
+
+
+@lru_cache(maxsize=256)
+def _matcher(keywords):
+    return KeywordMatcher(keywords, normalize=_norm)
+
+
+def matches_any(text, keywords):
+    """مطابقة محلية دقيقة: هل يحتوي النص (بعد التوحيد) على أي من الكلمات الأصلية؟ (آلة مبنية مرة لكل مجموعة كلمات)"""
+    return _matcher(tuple(keywords)).any(text)
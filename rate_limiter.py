@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+محدِّد معدل تكيّفي (token bucket لكل مضيف) مشترك لكل طلبات اعتماد.
+  - يبطئ عند 429/503 (خفض مضاعف) ويحترم Retry-After بإيقاف المضيف مؤقتاً
+  - يسرّع تدريجياً ما دامت الردود سليمة (زيادة جمعية) حتى RATE_LIMIT_MAX
+  - عدادات لكل مضيف عبر LIMITER.snapshot() / LIMITER.summary()
+الاستخدام:
+    wait = LIMITER.acquire(url); r = session.get(url); LIMITER.report(url, r.status_code, r.headers.get("Retry-After"))
+"""
+import time
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from config import RATE_LIMIT_INITIAL, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_BURST
+
+_THROTTLE_CODES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Retry-After بالثواني أو كتاريخ HTTP؛ يعيد ثوانٍ (float) أو None."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    def __init__(self, rate=RATE_LIMIT_INITIAL, burst=RATE_LIMIT_BURST,
+                 min_rate=RATE_LIMIT_MIN, max_rate=RATE_LIMIT_MAX,
+                 decrease=0.5, increase=0.25):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.decrease = decrease      # معامل الخفض عند 429/503
+        self.increase = increase      # زيادة المعدل (طلب/ث) لكل رد سليم
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "ok": 0, "throttled": 0, "retry_after": 0, "errors": 0, "waited_s": 0.0}
+
+    def reserve(self):
+        """يحجز رمزاً ويعيد مدة الانتظار اللازمة (قد يصبح الرصيد سالباً = حجز مسبق للطلبات المتزامنة)."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate, self.paused_until - now)
+            self.counters["requests"] += 1
+            self.counters["waited_s"] += wait
+            return wait
+
+    def on_response(self, status, retry_after=None):
+        with self.lock:
+            if status in _THROTTLE_CODES:
+                self.counters["throttled"] += 1
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.tokens = min(self.tokens, 0.0)
+                delay = parse_retry_after(retry_after)
+                if delay is not None:
+                    self.counters["retry_after"] += 1
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            elif status >= 500:
+                self.counters["errors"] += 1
+                self.rate = max(self.min_rate, self.rate * 0.75)
+            else:
+                self.counters["ok"] += 1
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_error(self):
+        """استثناء شبكة/مهلة: نعامله كإشارة ازدحام خفيفة."""
+        with self.lock:
+            self.counters["errors"] += 1
+            self.rate = max(self.min_rate, self.rate * 0.75)
+
+
+class RateLimiter:
+    def __init__(self, **bucket_kwargs):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._kwargs = bucket_kwargs
+
+    def bucket(self, url):
+        host = urlparse(url).netloc or url
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(**self._kwargs)
+        return b
+
+    def acquire(self, url):
+        """يحجب حتى يُسمح بطلب جديد لهذا المضيف؛ يعيد مدة الانتظار."""
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def report(self, url, status, retry_after=None):
+        self.bucket(url).on_response(status, retry_after)
+
+    def report_error(self, url):
+        self.bucket(url).on_error()
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._buckets.items())
+        return {host: dict(b.counters, rate=round(b.rate, 2)) for host, b in items}
+
+    def summary(self):
+        parts = []
+        for host, c in self.snapshot().items():
+            parts.append(f"{host}: {c['requests']} req, {c['throttled']} throttled, "
+                         f"{c['errors']} errors, waited {c['waited_s']:.1f}s, rate {c['rate']}/s")
+        return "Rate limiter | " + (" ; ".join(parts) if parts else "no requests")
+
+
+# محدِّد واحد مشترك على مستوى العملية (scraper.py + دفتر الملاحظات)
+LIMITER = RateLimiter()
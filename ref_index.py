@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس محلي لعمود "الرقم المرجعي" في الشيت (رقم الصف ← المرجع) لإزالة التكرار دون قراءة الشيت:
+  - يُحفظ ذرّياً في REF_INDEX_DIR (ملف لكل شيت/تبويب) ويُحدَّث بعد كل إلحاق بالصفوف التي أُضيفت فعلاً
+  - قبل استخدامه يُتحقق منه بخليتين فقط (آخر صف مفهرس والصف الذي بعده)؛ إن اختلفا (حذف/تعديل/إلحاق من خارج
+    الأداة) يُعاد بناؤه من العمود وحده على صفحات (REF_PAGE_SIZE صف لكل طلب)
+"""
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from config import REF_INDEX_DIR
+
+
+class RefIndex:
+    def __init__(self, sheet_id, tab, root=REF_INDEX_DIR):
+        self.sheet_id = sheet_id
+        self.tab = tab
+        name = hashlib.sha1(f"{sheet_id}|{tab}".encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(root, name + ".json")
+        os.makedirs(root, exist_ok=True)
+        self.column = None
+        self.refs = []          # refs[i] = مرجع الصف i + 2 ("" لصف بلا مرجع)
+
+    @property
+    def last_row(self):
+        """آخر صف بيانات مفهرس (1 = الشيت فيه العناوين فقط)."""
+        return len(self.refs) + 1
+
+    def ref_at(self, row):
+        return self.refs[row - 2] if 2 <= row <= self.last_row else ""
+
+    def ref_set(self):
+        return {r for r in self.refs if r}
+
+    def load(self, column):
+        """True إن وُجد فهرس محفوظ لنفس الشيت/التبويب/العمود."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (data.get("sheet_id"), data.get("tab"), data.get("column")) != (self.sheet_id, self.tab, column):
+            return False
+        self.column = column
+        self.refs = data.get("refs", [])
+        return True
+
+    def rebuild(self, column, refs):
+        self.column = column
+        self.refs = list(refs)
+        # الصفوف الفارغة في النهاية ليست بيانات
+        while self.refs and not self.refs[-1]:
+            self.refs.pop()
+
+    def extend(self, first_row, refs):
+        """يسجّل صفوفاً أُلحقت بدءاً من first_row (من updatedRange في رد الإلحاق)."""
+        gap = first_row - 2 - len(self.refs)
+        if gap < 0:
+            del self.refs[first_row - 2:]
+        else:
+            self.refs.extend([""] * gap)
+        self.refs.extend(refs)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sheet_id": self.sheet_id, "tab": self.tab, "column": self.column,
+                       "saved_at": datetime.now().isoformat(timespec="seconds"), "refs": self.refs},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """بعد تعديل يغيّر أرقام الصفوف (حذف): الاستخدام التالي يعيد البناء."""
+        self.refs = []
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -1,14 +1,29 @@
 # -*- coding: utf-8 -*-
+import os
 import re
-import time
-from urllib.parse import quote
+import threading
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
+from urllib.parse import quote, urlparse
 
 import requests
-from bs4 import BeautifulSoup
-import dateparser
+from requests.adapters import HTTPAdapter
 
-from config import BASE_URL, SEARCH_PATH, KEYWORDS, SHEET_COLUMNS
+from config import (
+    BASE_URL, SEARCH_PATH, KEYWORDS, SHEET_COLUMNS,
+    FETCH_WORKERS, PER_HOST_CONCURRENCY,
+    ARCHIVE_ENABLED, ARCHIVE_DIR, DETAILS_ENABLED, STREAM_BATCH_SIZE, PARSE_WORKERS, PARSE_BATCH_SIZE,
+)
+from http_cache import HttpCache
+from html_archive import HtmlArchive, read_entry
+from card_parser import search_cards
+from date_utils import is_today
+from query_planner import plan_queries, matches_any
+from rate_limiter import LIMITER
+from tender_details import fetch_details
+from checkpoint import Checkpoint, job_key
 
 SEARCH_URL = BASE_URL.rstrip("/") + SEARCH_PATH
 
@@ -22,93 +37,396 @@ HEADERS = {
     "Connection": "keep-alive",
 }
 
-def _is_today(text):
-    if not text:
-        return False
-    t = str(text).strip()
-    if "اليوم" in t or "Today" in t:
-        return True
-    dt = dateparser.parse(t, languages=["ar", "en"])
-    return bool(dt and dt.date() == datetime.now().date())
+# أسماء الحقول البديلة لكل عمود (بالترتيب: أول اسم يعطي قيمة يُعتمد)
+FIELD_ALIASES = {
+    "النشاط الاساسي": ("النشاط الاساسي", "نوع المنافسة"),
+    "اخر توقيت لاستلام الاستفسارات": ("اخر توقيت لاستلام الاستفسارات", "آخر موعد للاستفسارات"),
+    "قيمة الكراسة": ("قيمة الكراسة", "قيمة وثائق المنافسة"),
+    "الجهة": ("الجهة", "الجهة الحكومية", "الجهة الحكومية المعلنة"),
+    "الرقم المرجعي": ("الرقم المرجعي", "رقم المنافسة", "رقم المرجع"),
+    "اخر موعد لتقديم العرض": ("اخر موعد لتقديم العرض", "آخر موعد لتقديم العروض"),
+    "تاريخ نشرها": ("تاريخ نشرها", "تاريخ النشر", "تاريخ الطرح"),
+}
+
+def _trie_pattern(words):
+    """تعبير منتظم على شكل trie (البادئات المشتركة مدمجة) يطابق أطول كلمة في كل موضع."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(sub) for ch, sub in node.items() if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
 
-def _grab(label, txt):
-    m = re.search(rf"{label}\s*[:：]?\s*([^\n|]+)", txt)
-    return m.group(1).strip() if m else ""
+    return build(trie)
+
+# تُبنى مرة واحدة عند الاستيراد: تعبير واحد لكل الأسماء يلتقط القيمة بعد الاسم عبر lookahead (دون استهلاكها)،
+# وخريطة الأسماء المتضمَّنة داخل اسم أطول (مثل "الجهة" داخل "الجهة الحكومية") مع إزاحتها.
+_LABELS = sorted({a for aliases in FIELD_ALIASES.values() for a in aliases}, key=len, reverse=True)
+_VALUE_PAT = r"\s*[:：]?\s*([^\n|]+)"
+_VALUE_RE = re.compile(_VALUE_PAT)
+_LABEL_RE = re.compile("(" + _trie_pattern(_LABELS) + ")(?:(?=" + _VALUE_PAT + ")|)")
+_CONTAINED = {
+    l: [(a, i) for a in _LABELS for i in range(len(l)) if l.startswith(a, i)]
+    for l in _LABELS
+}
+
+def _scan_labels(txt):
+    """
+    مسح واحد للنص يعيد ({الاسم: [مواضع نهايته بالترتيب]}, {موضع: القيمة أو None}).
+    القيمة تعتمد على الموضع فقط، فما التقطه المسح يُعاد استخدامه ولا يُحسب الباقي إلا عند الحاجة.
+    """
+    pos, known = {}, {}
+    for m in _LABEL_RE.finditer(txt):
+        start = m.start()
+        known[m.end(1)] = m.group(2)
+        for label, off in _CONTAINED[m.group(1)]:
+            pos.setdefault(label, []).append(start + off + len(label))
+    return pos, known
+
+def _value_at(txt, ends, known):
+    """قيمة أول ظهور يطابقه تعبير القيمة (نفس نتيجة re.search لهذا الاسم)."""
+    for e in ends:
+        if e in known:
+            v = known[e]
+        else:
+            m = _VALUE_RE.match(txt, e)
+            v = m.group(1) if m else None
+        if v is not None:
+            return v.strip()
+    return ""
+
+def _fields(txt):
+    pos, known = _scan_labels(txt)
+    item = {}
+    for col, aliases in FIELD_ALIASES.items():
+        item[col] = ""
+        for a in aliases:
+            if a in pos:
+                v = _value_at(txt, pos[a], known)
+                if v:
+                    item[col] = v
+                    break
+    return item
 
 def _extract_from_card(card):
-    txt = card.get_text(" ", strip=True)
-    a   = card.find("a", href=True)
-    t   = card.find(["h5","h4","a"])
-
-    link  = a["href"] if a else ""
-    link  = link if link.startswith("http") else (BASE_URL.rstrip("/") + link if link else "")
-    title = t.get_text(strip=True) if t else ""
-
-    item = {
-        "النشاط الاساسي": _grab("النشاط الاساسي", txt) or _grab("نوع المنافسة", txt),
-        "اخر توقيت لاستلام الاستفسارات": _grab("اخر توقيت لاستلام الاستفسارات", txt) or _grab("آخر موعد للاستفسارات", txt),
-        "قيمة الكراسة": _grab("قيمة الكراسة", txt) or _grab("قيمة وثائق المنافسة", txt),
-        "الجهة": _grab("الجهة", txt) or _grab("الجهة الحكومية", txt) or _grab("الجهة الحكومية المعلنة", txt),
-        "الرقم المرجعي": _grab("الرقم المرجعي", txt) or _grab("رقم المنافسة", txt) or _grab("رقم المرجع", txt),
-        "اخر موعد لتقديم العرض": _grab("اخر موعد لتقديم العرض", txt) or _grab("آخر موعد لتقديم العروض", txt),
-        "الرابط": link,
-        "العنوان": title,
-        "تاريخ نشرها": _grab("تاريخ نشرها", txt) or _grab("تاريخ النشر", txt) or _grab("تاريخ الطرح", txt),
-    }
+    """card: card_parser.Card (النص والرابط والعنوان جاهزة من محرك التحليل)."""
+    link = card.href
+    link = link if link.startswith("http") else (BASE_URL.rstrip("/") + link if link else "")
+
+    item = _fields(card.text)
+    item["الرابط"] = link
+    item["العنوان"] = card.title
     return item
 
-def _fetch_html(url, tries=3, timeout=30):
-    for i in range(tries):
+class _HostGate:
+    """حد أقصى للطلبات المتزامنة لكل مضيف؛ الإيقاع نفسه يحدده LIMITER (token bucket تكيّفي)."""
+
+    def __init__(self, limit):
+        self._sem = threading.BoundedSemaphore(max(1, limit))
+
+    def __enter__(self):
+        self._sem.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._sem.release()
+        return False
+
+_GATES = {}
+_GATES_LOCK = threading.Lock()
+
+def _gate(url):
+    host = urlparse(url).netloc
+    with _GATES_LOCK:
+        g = _GATES.get(host)
+        if g is None:
+            g = _GATES[host] = _HostGate(PER_HOST_CONCURRENCY)
+    return g
+
+_SESSION = None
+_CACHE = None
+_ARCHIVE = None
+_SHARED_LOCK = threading.Lock()
+
+def _session():
+    """جلسة واحدة مشتركة (keep-alive + pool) بدل مصافحة TCP/TLS جديدة لكل كلمة."""
+    global _SESSION
+    with _SHARED_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            s.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(FETCH_WORKERS, PER_HOST_CONCURRENCY))
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSION = s
+    return _SESSION
+
+def _cache():
+    global _CACHE
+    with _SHARED_LOCK:
+        if _CACHE is None:
+            _CACHE = HttpCache()
+    return _CACHE
+
+def _archive():
+    global _ARCHIVE
+    with _SHARED_LOCK:
+        if _ARCHIVE is None:
+            _ARCHIVE = HtmlArchive()
+    return _ARCHIVE
+
+def _fetch_page(url, tries=3, timeout=30):
+    """يعيد (html, unchanged)؛ unchanged=True عندما يرد الخادم 304 فنستعمل النسخة المخزنة.
+    الانتظار بين المحاولات يحدده LIMITER حسب ردود الخادم (429/503/Retry-After) بدل مهلة ثابتة."""
+    cache = _cache()
+    for _ in range(tries):
         try:
-            r = requests.get(url, headers=HEADERS, timeout=timeout)
-            if r.status_code == 200 and ("</html>" in r.text.lower() or r.text.strip()):
-                return r.text
+            with _gate(url):
+                LIMITER.acquire(url)
+                r = _session().get(url, headers=cache.conditional_headers(url), timeout=timeout)
         except Exception:
-            pass
-        time.sleep(1 + i)
-    return ""
+            LIMITER.report_error(url)
+            continue
+        LIMITER.report(url, r.status_code, r.headers.get("Retry-After"))
+        if r.status_code == 304:
+            entry = cache.load(url)
+            if entry:
+                return entry["body"], True
+        if r.status_code == 200 and ("</html>" in r.text.lower() or r.text.strip()):
+            cache.store(url, r.headers, r.text)
+            return r.text, False
+    return "", False
 
-def scrape_opportunities(keywords=KEYWORDS, require_today=True, per_kw_limit=25, headless=False):
-    # headless الوسيط موجود للإتساق مع orchestrator لكنه غير مستخدم هنا
-    results, seen = [], set()
+def _fetch_html(url, tries=3, timeout=30):
+    return _fetch_page(url, tries=tries, timeout=timeout)[0]
+
+def _fetch_all(urls, workers=FETCH_WORKERS):
+    """يجلب الصفحات بالتوازي ويعيد (url, html, unchanged) بنفس ترتيب urls، فيبقى التحليل والـdedup مطابقاً للمسار التسلسلي."""
+    def one(url):
+        html, unchanged = _fetch_page(url)
+        return url, html, unchanged
 
-    for kw in keywords:
-        url = SEARCH_URL + quote(kw)
-        html = _fetch_html(url)
+    if workers <= 1 or len(urls) <= 1:
+        for url in urls:
+            yield one(url)
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as ex:
+        yield from ex.map(one, urls)
+
+def _page_items(html):
+    # بطاقات محتملة: div.card-body ثم div.card ثم fallback لعناصر شبيهة (انظر card_parser)
+    items = []
+    for c in search_cards(html):
+        item = _extract_from_card(c)
+        if item["العنوان"] and item["الرابط"]:
+            items.append(item)
+    return items
+
+def _cached_items(url):
+    """بطاقات صفحة لم تتغير (304) من الكاش، أو None إن لم تُخزَّن بعد."""
+    entry = _cache().load(url)
+    return entry["items"] if entry and entry.get("items") is not None else None
+
+def _parse_batch(pages):
+    # تعمل داخل عملية عاملة: HTML خام (bytes) → سجلات بسيطة (dict) قابلة للنقل بين العمليات
+    return [_page_items(p.decode("utf-8")) for p in pages]
+
+def _parse_stream(pages, workers=PARSE_WORKERS, batch_size=PARSE_BATCH_SIZE):
+    """
+    pages: مولِّد (ctx, html أو None). يعيد (ctx, items أو None) بنفس الترتيب؛ None = لا تحليل مطلوب.
+    workers<=1 (الافتراضي) يحلل كل صفحة في نفس الخيط فور وصولها. workers>1 يرسل الصفحات إلى مجمع عمليات
+    فيتوزع التحليل على الأنوية بينما يستمر الجلب: الصفحة تُرسل فوراً ما دامت هناك عملية خاملة، ولا تُجمع
+    في دفعة (حتى batch_size) إلا والعمليات كلها مشغولة؛ الدفعات قيد التحليل محدودة بـ 2 × workers.
+    """
+    if workers <= 1:
+        for ctx, html in pages:
+            yield ctx, (_page_items(html) if html is not None else None)
+        return
+
+    def drain(entry):
+        batch, fut = entry
+        parsed = iter(fut.result() if fut else ())
+        for ctx, html in batch:
+            yield ctx, (next(parsed) if html is not None else None)
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        # إنشاء العمليات قبل أن يبدأ مولِّد الجلب خيوطه (fork مع خيوط نشطة غير آمن)
+        ex.submit(int).result()
+        pending, batch = deque(), []
+        for ctx, html in pages:
+            batch.append((ctx, html))
+            busy = sum(1 for _, fut in pending if fut is not None and not fut.done())
+            if len(batch) < batch_size and busy >= workers:
+                continue
+            raw = [h.encode("utf-8") for _, h in batch if h is not None]
+            pending.append((batch, ex.submit(_parse_batch, raw) if raw else None))
+            batch = []
+            while len(pending) > 2 * workers or (pending and (pending[0][1] is None or pending[0][1].done())):
+                yield from drain(pending.popleft())
+        if batch:
+            raw = [h.encode("utf-8") for _, h in batch if h is not None]
+            pending.append((batch, ex.submit(_parse_batch, raw) if raw else None))
+        while pending:
+            yield from drain(pending.popleft())
+
+def _iter_select(items, members, limit, require_today, seen, today=None):
+    """الفلترة المحلية + dedup + حد كل استعلام؛ تعيد (كمولِّد) العناصر المقبولة بترتيب أعمدة الشيت."""
+    picked = 0
+    for item in items:
+        if picked >= limit:
+            break
+
+        # مطابقة محلية بالكلمات الأصلية التي غطّتها عبارة البحث
+        if members and not matches_any(" ".join(item.values()), members):
+            continue
+
+        pub = item.get("تاريخ نشرها", "")
+        if require_today and pub and not is_today(pub, today=today):
+            continue
+
+        key = (item.get("الرقم المرجعي",""), item["العنوان"], item["الرابط"])
+        if key in seen:
+            continue
+        seen.add(key)
+
+        # أعِد ترتيب الأعمدة لتطابق Sheet1 تمامًا
+        yield {col: item.get(col, "") for col in SHEET_COLUMNS}
+        picked += 1
+
+def batched(iterable, size):
+    """يجمع عناصر مولِّد في قوائم بحجم size (الأخيرة قد تكون أقصر)."""
+    batch = []
+    for x in iterable:
+        batch.append(x)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _apply_details(results, details):
+    """يكمل الحقول الناقصة من صفحة التفاصيل ويضيف "الوصف" (عمود إضافي لا يُكتب في الشيت)."""
+    for item, d in zip(results, details):
+        if not d:
+            continue
+        item["النشاط الاساسي"] = item["النشاط الاساسي"] or d.get("النشاط", "") or d.get("نوع المنافسة", "")
+        item["قيمة الكراسة"] = item["قيمة الكراسة"] or d.get("قيمة وثائق المنافسة", "")
+        item["الجهة"] = item["الجهة"] or d.get("الجهة", "")
+        item["الوصف"] = d.get("الوصف", "")
+
+def iter_opportunities(keywords=KEYWORDS, require_today=True, per_kw_limit=25, workers=FETCH_WORKERS, plan=True,
+                       resume=False, parse_workers=PARSE_WORKERS, parse_batch=PARSE_BATCH_SIZE):
+    """
+    مولِّد: يعيد كل منافسة (بترتيب أعمدة الشيت) فور تحليل صفحتها، بينما يستمر جلب بقية الصفحات في الخلفية.
+    workers=1 يعيد السلوك التسلسلي القديم، plan=False يبحث بكل كلمة على حدة.
+    بعد كل صفحة تُحفظ نقطة استئناف (الاستعلامات المنجزة + المفاتيح المرئية + النتائج)؛ resume=True يكمل منها:
+    تُعاد النتائج المحفوظة أولاً (update_sheet يتخطى المكرر بالرقم المرجعي) ثم تُجلب الاستعلامات المتبقية فقط.
+    التحليل يجري في نفس الخيط (parse_workers=1، الافتراضي) أو في مجمع عمليات منفصل عن خيوط الجلب
+    (parse_workers=0 ← عدد الأنوية، N ← N عملية).
+    """
+    keywords = list(keywords)
+    if plan:
+        qp = plan_queries(keywords)
+        print(qp.summary())
+        queries = qp.queries
+    else:
+        queries = [(kw, None) for kw in keywords]
+
+    ckpt = Checkpoint("opportunities", job_key(queries, require_today, per_kw_limit, datetime.now().date()))
+    state = (ckpt.load() if resume else None) or {"done": [], "seen": [], "results": []}
+    if state["done"]:
+        print(f"استئناف: {len(state['done'])}/{len(queries)} استعلام منجز، {len(state['results'])} نتيجة محفوظة")
+        yield from state["results"]
+    done = set(state["done"])
+    seen = {tuple(k) for k in state["seen"]}
+    queries = [(term, members) for term, members in queries if term not in done]
+
+    urls = [SEARCH_URL + quote(term) for term, _ in queries]
+
+    def fetched():
+        # الصفحات غير المتغيرة (304) ببطاقات مخزنة لا تُرسل للتحليل
+        for query, (url, html, unchanged) in zip(queries, _fetch_all(urls, workers)):
+            cached = _cached_items(url) if html and unchanged else None
+            yield (query, url, html, unchanged, cached), (html if html and cached is None else None)
+
+    # لا فائدة من عمليات أكثر من عدد الدفعات
+    parse_workers = min(parse_workers or os.cpu_count() or 1, -(-len(queries) // max(1, parse_batch)))
+    failed = 0
+    for ((term, members), url, html, unchanged, cached), parsed in _parse_stream(fetched(), parse_workers, parse_batch):
         if not html:
+            failed += 1
             continue
+        if parsed is not None:
+            _cache().store_items(url, parsed)
 
-        soup = BeautifulSoup(html, "lxml")
+        # كل جلب يُسجَّل في أرشيف يومه؛ الصفحة غير المتغيرة (304) سطر فهرس يشير إلى آخر نسخة محفوظة
+        if ARCHIVE_ENABLED:
+            _archive().append(url, html, meta={"term": term, "members": members}, unchanged=unchanged)
 
-        # بطاقات محتملة
-        cards = soup.select("div.card-body")
-        if not cards:
-            cards = soup.select("div.card")
-        if not cards:
-            # fallback: حاول نلقط عناصر شبيهة
-            cards = soup.select("li, article, div")
+        limit = per_kw_limit * len(members) if members else per_kw_limit
+        page = cached if parsed is None else parsed
+        items = list(_iter_select(page, members, limit, require_today, seen))
+        state["done"].append(term)
+        state["seen"] = [list(k) for k in seen]
+        state["results"].extend(items)
+        ckpt.save(state)
+        yield from items
 
-        picked = 0
-        for c in cards:
-            if picked >= per_kw_limit:
-                break
+    # الصفحات الفاشلة تبقى في النقطة ليعيد --resume محاولتها وحدها
+    if not failed:
+        ckpt.clear()
+    print(LIMITER.summary())
 
-            item = _extract_from_card(c)
-            if not item["العنوان"] or not item["الرابط"]:
-                continue
+def iter_opportunity_batches(keywords=KEYWORDS, require_today=True, per_kw_limit=25, workers=FETCH_WORKERS,
+                             plan=True, enrich=DETAILS_ENABLED, batch_size=STREAM_BATCH_SIZE, resume=False):
+    """دفعات من iter_opportunities (مع إثراء التفاصيل لكل دفعة) لمستهلكين يكتبون بالجملة مثل update_sheet_stream."""
+    for batch in batched(iter_opportunities(keywords, require_today, per_kw_limit, workers, plan, resume), batch_size):
+        if enrich:
+            _apply_details(batch, fetch_details(batch, session=_session()))
+        yield batch
 
-            pub = item.get("تاريخ نشرها", "")
-            if require_today and pub and not _is_today(pub):
-                continue
+def scrape_opportunities(keywords=KEYWORDS, require_today=True, per_kw_limit=25, headless=False,
+                         workers=FETCH_WORKERS, plan=True, enrich=DETAILS_ENABLED, resume=False):
+    # headless الوسيط موجود للإتساق مع orchestrator لكنه غير مستخدم هنا
+    # enrich=True يجلب صفحات التفاصيل للنتائج المختارة فقط (الجديدة منها؛ السابقة من الكاش)
+    results = []
+    for batch in iter_opportunity_batches(keywords, require_today, per_kw_limit, workers, plan, enrich,
+                                          resume=resume):
+        results.extend(batch)
+    return results
 
-            key = (item.get("الرقم المرجعي",""), item["العنوان"], item["الرابط"])
-            if key in seen:
-                continue
-            seen.add(key)
+def _reparse_one(entry):
+    # تعمل داخل عملية منفصلة: قراءة السجل من القرص + التحليل فقط، بلا شبكة
+    return _page_items(read_entry(ARCHIVE_DIR, entry))
 
-            # أعِد ترتيب الأعمدة لتطابق Sheet1 تمامًا
-            ordered = {col: item.get(col, "") for col in SHEET_COLUMNS}
-            results.append(ordered)
-            picked += 1
+def reparse_archive(since=None, until=None, require_today=True, per_kw_limit=25, workers=None):
+    """
+    يعيد بناء النتائج من الأرشيف دون شبكة. workers (افتراضياً PARSE_WORKERS): 1 في نفس الخيط،
+    0 أو أكثر من 1 يوزع التحليل على مجمع عمليات (مفيد لأرشيف كبير).
+    require_today يُقيَّم نسبةً إلى تاريخ جلب كل صفحة (ما كان سيظهر في ذلك اليوم).
+    """
+    entries = HtmlArchive().entries(since=since, until=until)
+    results, seen = [], set()
+    if not entries:
+        return results
 
+    workers = (PARSE_WORKERS if workers is None else workers) or os.cpu_count() or 1
+    with ExitStack() as stack:
+        if workers <= 1:
+            pages = map(_reparse_one, entries)
+        else:
+            ex = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            pages = ex.map(_reparse_one, entries, chunksize=PARSE_BATCH_SIZE)
+        for entry, items in zip(entries, pages):
+            members = entry["meta"].get("members")
+            limit = per_kw_limit * len(members) if members else per_kw_limit
+            fetched = datetime.fromisoformat(entry["fetched_at"]).date()
+            results.extend(_iter_select(items, members, limit, require_today, seen, today=fetched))
     return results
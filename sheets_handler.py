@@ -1,47 +1,18 @@
 %%bash
 cat > /content/drive/MyDrive/opportunity_agent/sheets_handler.py << 'PY'
 # -*- coding: utf-8 -*-
-import os, json, pickle
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
-from google.oauth2.service_account import Credentials as SA_Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from config import SHEET_ID, SHEET_TAB, SHEET_COLUMNS
+import re
+from google_clients import service
+from ref_index import RefIndex
+from config import SHEET_ID, SHEET_TAB, SHEET_COLUMNS, REF_PAGE_SIZE
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-
-def _load_credentials():
-    cred_path = "credentials.json"
-    if not os.path.exists(cred_path):
-        raise FileNotFoundError("credentials.json غير موجود في المسار الحالي.")
-
-    with open(cred_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Service Account
-    if isinstance(data, dict) and data.get("type") == "service_account" and data.get("client_email"):
-        return SA_Credentials.from_service_account_file(cred_path, scopes=SCOPES)
-
-    # OAuth Client (Console Flow)
-    creds = None
-    token_path = "token.json"
-    if os.path.exists(token_path):
-        with open(token_path, "rb") as t:
-            creds = pickle.load(t)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(cred_path, SCOPES)
-            # لا نحاول فتح متصفح في كولاب
-            creds = flow.run_console()
-        with open(token_path, "wb") as t:
-            pickle.dump(creds, t)
-    return creds
+REF_COL = "الرقم المرجعي"
 
 def _svc():
-    creds = _load_credentials()
-    return build("sheets", "v4", credentials=creds).spreadsheets()
+    # عميل مشترك للعملية (google_clients): الاعتماد والـ discovery يُحمَّلان مرة واحدة لا في كل استدعاء
+    # console=True: لا نحاول فتح متصفح في كولاب
+    return service("sheets", "v4", SCOPES, console=True).spreadsheets()
 
 def _ensure_headers():
     s = _svc()
@@ -55,24 +26,70 @@ def _ensure_headers():
             body={"values": [SHEET_COLUMNS]},
         ).execute()
 
-def _read_existing_refs():
+def _col_letter(i):
+    # 0 -> A, 25 -> Z, 26 -> AA
+    out = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        out = chr(65 + r) + out
+    return out
+
+def _row_count(s):
+    meta = s.get(spreadsheetId=SHEET_ID, ranges=[SHEET_TAB],
+                 fields="sheets(properties(title,gridProperties(rowCount)))").execute()
+    for sh in meta.get("sheets", []):
+        if sh["properties"]["title"] == SHEET_TAB:
+            return sh["properties"]["gridProperties"]["rowCount"]
+    return 1
+
+def _read_ref_column(col, page=REF_PAGE_SIZE):
+    """عمود المراجع وحده (من الصف 2) على صفحات حتى آخر صف في الشبكة، بدل تنزيل الشيت كاملاً."""
     s = _svc()
-    res = s.values().get(spreadsheetId=SHEET_ID, range=f"{SHEET_TAB}!A1:Z1000000").execute()
-    vals = res.get("values", [])
-    if not vals:
-        return set()
-    hdr, rows = vals[0], vals[1:]
-    if "الرقم المرجعي" not in hdr:
-        return set()
-    i = hdr.index("الرقم المرجعي")
-    return set(r[i] for r in rows if len(r) > i and r[i])
+    refs = []
+    last = _row_count(s)
+    for start in range(2, last + 1, page):
+        end = min(start + page - 1, last)
+        res = s.values().get(spreadsheetId=SHEET_ID, range=f"{SHEET_TAB}!{col}{start}:{col}{end}",
+                             majorDimension="COLUMNS").execute()
+        vals = (res.get("values") or [[]])[0]
+        # القيم الفارغة في آخر الصفحة تُحذف من الرد: نكمل الصفحة بفراغات لتبقى أرقام الصفوف صحيحة
+        refs.extend(vals + [""] * (end - start + 1 - len(vals)))
+    return [str(r).strip() for r in refs]
+
+def _in_sync(index):
+    """يتحقق من الفهرس المحفوظ بخليتين: آخر صف مفهرس كما هو، والصف الذي بعده فارغ."""
+    col, last = index.column, index.last_row
+    ranges = [f"{SHEET_TAB}!{col}{last}", f"{SHEET_TAB}!{col}{last + 1}"]
+    res = _svc().values().batchGet(spreadsheetId=SHEET_ID, ranges=ranges).execute()
+    cells = [str(((vr.get("values") or [[""]])[0] or [""])[0]).strip() for vr in res.get("valueRanges", [])]
+    if len(cells) != 2:
+        return False
+    expected = index.ref_at(last) if last >= 2 else REF_COL
+    return cells[0] == expected and not cells[1]
+
+def _ref_index():
+    """فهرس المراجع المحفوظ إن كان مطابقاً للشيت، وإلا يُعاد بناؤه من عمود المراجع وحده."""
+    col = _col_letter(SHEET_COLUMNS.index(REF_COL))
+    index = RefIndex(SHEET_ID, SHEET_TAB)
+    if index.load(col) and _in_sync(index):
+        return index
+    index.rebuild(col, _read_ref_column(col))
+    index.save()
+    return index
+
+def _appended_first_row(res):
+    # updatedRange مثل "Sheet1!A120:I125"
+    m = re.search(r"![A-Z]+(\d+)", (res.get("updates") or {}).get("updatedRange", ""))
+    return int(m.group(1)) if m else None
 
 def _append_rows(items):
+    """يعيد رد الإلحاق (فيه updatedRange) أو None إن لم يوجد ما يُلحق."""
     if not items:
-        return
+        return None
     s = _svc()
     rows = [[(itm.get(c) or "").strip() for c in SHEET_COLUMNS] for itm in items]
-    s.values().append(
+    return s.values().append(
         spreadsheetId=SHEET_ID,
         range=f"{SHEET_TAB}!A1",
         valueInputOption="RAW",
@@ -80,14 +97,42 @@ def _append_rows(items):
         body={"values": rows},
     ).execute()
 
-def update_sheet(items):
-    _ensure_headers()
-    existing = _read_existing_refs()
+def _new_items(items, existing):
+    # يضيف المراجع الجديدة إلى existing أولاً بأول فلا يتكرر مرجع بين الدفعات
     new_items = []
     for it in items:
-        ref = (it.get("الرقم المرجعي") or "").strip()
+        ref = (it.get(REF_COL) or "").strip()
         if ref and ref in existing:
             continue
+        if ref:
+            existing.add(ref)
         new_items.append(it)
-    _append_rows(new_items)
+    return new_items
+
+def update_sheet(items):
+    update_sheet_stream([items])
+
+def update_sheet_stream(batches):
+    """يكتب كل دفعة فور وصولها (مثل scraper.iter_opportunity_batches)؛ يعيد عدد الصفوف المضافة."""
+    existing = index = None
+    added = 0
+    for batch in batches:
+        if not batch:
+            continue
+        if existing is None:
+            # أول دفعة فعلية فقط: لا اتصال بالشيت إن لم توجد نتائج
+            _ensure_headers()
+            index = _ref_index()
+            existing = index.ref_set()
+        new_items = _new_items(batch, existing)
+        res = _append_rows(new_items)
+        if res is not None:
+            first = _appended_first_row(res)
+            if first is None:
+                index.clear()   # لا نعرف أين أُلحقت الصفوف: إعادة بناء في التشغيل التالي
+            else:
+                index.extend(first, [(it.get(REF_COL) or "").strip() for it in new_items])
+                index.save()
+        added += len(new_items)
+    return added
 PY
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+إثراء المنافسات من صفحات التفاصيل (/Tender/Details...):
+  - جلب متوازٍ بعدد عمّال محدود (DETAIL_WORKERS) وعبر محدِّد المعدل المشترك LIMITER
+  - تحليل الحقول الكاملة بـ card_parser.detail_fields (النشاط، الوصف، قيمة الوثائق...)
+  - كاش على القرص لكل رقم مرجعي (أو الرابط إن غاب الرقم): صفحة كل منافسة تُجلب مرة واحدة طوال عمرها
+"""
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import DETAIL_WORKERS, DETAILS_CACHE_DIR
+from card_parser import detail_fields
+from rate_limiter import LIMITER
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept-Language": "ar-SA,ar;q=0.9,en;q=0.8",
+    "Accept": "text/html,application/xhtml+xml",
+    "Connection": "keep-alive",
+}
+
+
+class DetailCache:
+    def __init__(self, root=DETAILS_CACHE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, url, fields):
+        path = self._path(key)
+        tmp = path + ".tmp"
+        entry = {"key": key, "url": url, "fetched_at": datetime.now().isoformat(timespec="seconds"), "fields": fields}
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def _session(workers):
+    s = requests.Session()
+    s.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, workers))
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+def _fetch(session, url, tries=3, timeout=30):
+    for _ in range(tries):
+        LIMITER.acquire(url)
+        try:
+            r = session.get(url, timeout=timeout)
+        except requests.RequestException:
+            LIMITER.report_error(url)
+            continue
+        LIMITER.report(url, r.status_code, r.headers.get("Retry-After"))
+        if r.status_code == 200 and r.text.strip():
+            return r.text
+    return ""
+
+def _key(record, ref_col, link_col):
+    ref = str(record.get(ref_col) or "").strip()
+    return ref or str(record.get(link_col) or "").strip()
+
+
+def fetch_details(records, ref_col="الرقم المرجعي", link_col="الرابط", workers=DETAIL_WORKERS,
+                  session=None, cache=None):
+    """
+    يعيد قائمة {العمود: القيمة} بنفس ترتيب records ({} لما تعذّر جلبه أو لا رابط تفاصيل له).
+    المخزَّن في الكاش لا يُعاد جلبه؛ الفشل لا يُخزَّن فيُعاد المحاولة في التشغيل التالي.
+    """
+    cache = cache or DetailCache()
+    out = [{} for _ in records]
+    todo = {}   # key -> (url, [indexes]) حتى لا تُجلب الصفحة نفسها مرتين في نفس الدفعة
+    hits = 0
+    for i, rec in enumerate(records):
+        url = str(rec.get(link_col) or "")
+        key = _key(rec, ref_col, link_col)
+        if not key or "/Tender/Details" not in url:
+            continue
+        entry = cache.load(key)
+        if entry is not None:
+            out[i] = entry["fields"]
+            hits += 1
+            continue
+        todo.setdefault(key, (url, []))[1].append(i)
+
+    failed = 0
+    if todo:
+        session = session or _session(workers)
+
+        def one(item):
+            key, (url, _) = item
+            html = _fetch(session, url)
+            return key, url, detail_fields(html) if html else {}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as ex:
+            for key, url, fields in ex.map(one, todo.items()):
+                if not fields:
+                    failed += 1
+                    continue
+                cache.store(key, url, fields)
+                for i in todo[key][1]:
+                    out[i] = fields
+    print(f"Details: {hits} cached | {len(todo) - failed} fetched | {failed} failed")
+    return out
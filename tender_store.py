@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+مخزن محلي (SQLite) لكل المنافسات هو المرجع، والشيت مجرد إسقاط (projection) له:
+  - tenders: صف لكل منافسة بمفتاح الرقم المرجعي (أو الرابط إن غاب)، مع أول/آخر يوم ظهرت فيه (مفهرسان)
+  - projection: ما كُتب في الشيت آخر مرة (المفتاح + بصمة القيم لكل صف بالترتيب)
+  - SheetProjection.sync يحسب الفرق بين المطلوب والمكتوب ويرسل أقل التغييرات دفعة واحدة لكل نوع:
+    حذف نطاقات متصلة (batch_update واحد)، تحديث الصفوف المتغيرة (batch_update واحد)، وإلحاق الجديد (append_rows واحد)
+التحليل وإزالة التكرار يقرآن من SQLite محلياً (to_dataframe / known_refs) بلا أي طلب للشيت.
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+from config import TENDER_DB_PATH, DELETE_RANGES_PER_REQUEST
+from ref_index import RefIndex
+
+REF_COL = "الرقم المرجعي"
+LINK_COL = "الرابط"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenders (
+    key        TEXT PRIMARY KEY,
+    ref        TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tenders_ref ON tenders(ref);
+CREATE INDEX IF NOT EXISTS tenders_first_seen ON tenders(first_seen);
+CREATE INDEX IF NOT EXISTS tenders_last_seen ON tenders(last_seen);
+CREATE TABLE IF NOT EXISTS projection (
+    sheet TEXT NOT NULL,
+    pos   INTEGER NOT NULL,
+    key   TEXT NOT NULL,
+    hash  TEXT NOT NULL,
+    PRIMARY KEY (sheet, pos)
+);
+"""
+
+
+def _key(rec):
+    ref = str(rec.get(REF_COL) or "").strip()
+    if ref:
+        return ref
+    link = str(rec.get(LINK_COL) or "").strip()
+    return "link:" + link if link else None
+
+
+def _clean(v):
+    # NaN / None / pd.NA / NaT -> "" وأنواع numpy -> بايثون، حتى تبقى البيانات قابلة لـ JSON وللكتابة في الشيت
+    if v is None or (isinstance(v, float) and v != v):
+        return ""
+    if isinstance(v, (str, int, float, bool)):
+        return v
+    if hasattr(v, "item"):
+        return _clean(v.item())
+    s = str(v)
+    return "" if s in ("<NA>", "NaT", "nan") else s
+
+
+def _hash(values):
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def contiguous_ranges(rows):
+    """أرقام صفوف -> نطاقات متصلة (start, end) تنازلياً، فحذفها بالترتيب لا يغيّر أرقام ما لم يُحذف بعد."""
+    out = []
+    for r in sorted(set(rows), reverse=True):
+        if out and out[-1][0] == r + 1:
+            out[-1] = (r, out[-1][1])
+        else:
+            out.append((r, r))
+    return out
+
+
+def forget_ref_index(ws):
+    """بعد حذف صفوف أو إعادة كتابة الجسم: فهرس المراجع المحفوظ للتبويب لم يعد يطابق أرقام الصفوف، فيُحذف ليُعاد بناؤه."""
+    RefIndex(ws.spreadsheet.id, ws.title).clear()
+
+
+def delete_row_ranges(ws, rows, per_request=DELETE_RANGES_PER_REQUEST):
+    """
+    يحذف صفوف الشيت (أرقام تبدأ من 1) بطلبات batch_update: deleteDimension لكل نطاق متصل، من الأسفل للأعلى،
+    وper_request نطاقاً في كل طلب (طلب واحد في المعتاد). يعيد النطاقات المحذوفة (ويُسقط فهرس المراجع إن حُذف شيء).
+    """
+    ranges = contiguous_ranges(rows)
+    if ranges:
+        forget_ref_index(ws)
+    for i in range(0, len(ranges), per_request):
+        ws.spreadsheet.batch_update({"requests": [
+            {"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS",
+                                           "startIndex": start - 1, "endIndex": end}}}
+            for start, end in ranges[i:i + per_request]
+        ]})
+    return ranges
+
+
+def _col(n):
+    # 1 -> A, 27 -> AA
+    out = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        out = chr(65 + r) + out
+    return out
+
+
+class TenderStore:
+    def __init__(self, path=TENDER_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def upsert(self, records, seen_on):
+        """
+        يدرج المنافسات الجديدة ويحدّث الموجودة (first_seen يبقى، last_seen = seen_on) في معاملة واحدة.
+        يعيد (عدد الجديد، عدد ما تغيّرت بياناته).
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        inserted = updated = 0
+        with self._lock, self._conn:
+            for rec in records:
+                key = _key(rec)
+                if key is None:
+                    continue
+                data = json.dumps({k: _clean(v) for k, v in rec.items()}, ensure_ascii=False)
+                row = self._conn.execute("SELECT data FROM tenders WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO tenders (key, ref, first_seen, last_seen, updated_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, str(rec.get(REF_COL) or "").strip() or None, seen_on, seen_on, now, data))
+                    inserted += 1
+                elif row[0] != data:
+                    self._conn.execute("UPDATE tenders SET last_seen = ?, updated_at = ?, data = ? WHERE key = ?",
+                                       (seen_on, now, data, key))
+                    updated += 1
+                else:
+                    self._conn.execute("UPDATE tenders SET last_seen = ? WHERE key = ?", (seen_on, key))
+        return inserted, updated
+
+    def has(self, ref):
+        return self._conn.execute("SELECT 1 FROM tenders WHERE ref = ?", (ref,)).fetchone() is not None
+
+    def known_refs(self):
+        return {r for (r,) in self._conn.execute("SELECT ref FROM tenders WHERE ref IS NOT NULL")}
+
+    def count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM tenders").fetchone()[0]
+
+    def rows(self, seen_on=None, since=None):
+        """السجلات (dict) بترتيب أول ظهور؛ seen_on: ما ظهر في ذلك اليوم، since: ما ظهر أول مرة منذ تاريخ."""
+        sql, args = "SELECT key, data FROM tenders", []
+        where = []
+        if seen_on is not None:
+            where.append("last_seen = ?")
+            args.append(seen_on)
+        if since is not None:
+            where.append("first_seen >= ?")
+            args.append(since)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY first_seen, rowid"
+        return [dict(json.loads(data), _key=key) for key, data in self._conn.execute(sql, args)]
+
+    def to_dataframe(self, columns=None, **filters):
+        """نفس rows() كـ DataFrame (للتحليل محلياً)؛ columns تحدد الأعمدة وترتيبها."""
+        import pandas as pd
+        df = pd.DataFrame(self.rows(**filters)).drop(columns="_key", errors="ignore")
+        if columns is not None:
+            df = df.reindex(columns=list(columns))
+        return df
+
+    def _projection(self, sheet):
+        return self._conn.execute("SELECT key, hash FROM projection WHERE sheet = ? ORDER BY pos", (sheet,)).fetchall()
+
+    def _save_projection(self, sheet, entries):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM projection WHERE sheet = ?", (sheet,))
+            self._conn.executemany("INSERT INTO projection (sheet, pos, key, hash) VALUES (?, ?, ?, ?)",
+                                   [(sheet, i, k, h) for i, (k, h) in enumerate(entries)])
+
+
+class SheetProjection:
+    """
+    الشيت (gspread Worksheet) كإسقاط للمخزن: صف العناوين ثم صف لكل سجل. الصفوف الباقية تبقى في أماكنها
+    والجديدة تُلحق في النهاية (records مرتبة بأول ظهور، فالترتيب يطابقها في الاستخدام المعتاد).
+    """
+
+    def __init__(self, store, ws, columns):
+        self.store = store
+        self.ws = ws
+        self.columns = list(columns)
+        self.sheet = f"{ws.spreadsheet.id}/{ws.id}"
+
+    def _values(self, rec):
+        return [_clean(rec.get(c, "")) for c in self.columns]
+
+    def _matches_sheet(self, current):
+        # تحقق بعمود المرجع وحده (طلب واحد): أي تعديل يدوي في عدد/ترتيب الصفوف يُسقط الفرق ويعيد الكتابة
+        if REF_COL not in self.columns:
+            return True
+        refs = self.ws.col_values(self.columns.index(REF_COL) + 1)[1:]
+        while refs and not refs[-1]:
+            refs.pop()
+        expected = [k if not k.startswith("link:") else "" for k, _ in current]
+        while expected and not expected[-1]:
+            expected.pop()
+        return [str(r).strip() for r in refs] == expected
+
+    def _rewrite(self, desired):
+        last = max(self.ws.row_count, 2)
+        self.ws.batch_clear([f"A2:{_col(len(self.columns))}{last}"])
+        forget_ref_index(self.ws)
+        if desired:
+            self.ws.append_rows([v for _, v, _ in desired], value_input_option="RAW", table_range="A1")
+
+    def sync(self, records, verify=True):
+        """
+        يجعل الشيت = records (بالترتيب) بأقل التغييرات. verify=True يقارن عمود المرجع أولاً؛
+        إن اختلف الشيت عما كُتب آخر مرة تُعاد كتابة الجسم كاملاً مرة واحدة. يعيد إحصاءات ما أُرسل
+        (rows = عدد صفوف البيانات بعد المزامنة، فالمُلحق هو آخر inserted صفاً منها).
+        """
+        desired, seen = [], set()
+        for rec in records:
+            key = rec.get("_key") or _key(rec)
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            values = self._values(rec)
+            desired.append((key, values, _hash(values)))
+        current = self.store._projection(self.sheet)
+        stats = {"deleted": 0, "delete_ranges": 0, "updated": 0, "inserted": 0, "rewrite": False, "rows": len(desired)}
+
+        if verify and not self._matches_sheet(current):
+            self._rewrite(desired)
+            stats.update(rewrite=True, inserted=len(desired))
+            self.store._save_projection(self.sheet, [(k, h) for k, _, h in desired])
+            return stats
+
+        want = {k: (v, h) for k, v, h in desired}
+        # 1) حذف ما لم يعد مطلوباً: نطاقات متصلة في طلب واحد
+        gone = [i + 2 for i, (k, _) in enumerate(current) if k not in want]
+        stats["delete_ranges"] = len(delete_row_ranges(self.ws, gone))
+        stats["deleted"] = len(gone)
+        kept = [(k, h) for k, h in current if k in want]
+
+        # 2) تحديث الصفوف الباقية التي تغيّرت قيمها: كل تسلسل متصل نطاق واحد، وكلها في batch_update واحد
+        changed = [(i + 2, k) for i, (k, h) in enumerate(kept) if want[k][1] != h]
+        if changed:
+            data, run = [], []
+            for row, k in changed + [(None, None)]:
+                if run and (row is None or row != run[-1][0] + 1):
+                    start, end = run[0][0], run[-1][0]
+                    data.append({"range": f"A{start}:{_col(len(self.columns))}{end}",
+                                 "values": [want[key][0] for _, key in run]})
+                    run = []
+                if row is not None:
+                    run.append((row, k))
+            self.ws.batch_update(data, value_input_option="RAW")
+            stats["updated"] = len(changed)
+
+        # 3) إلحاق الجديد دفعة واحدة
+        have = {k for k, _ in kept}
+        new = [(k, v, h) for k, v, h in desired if k not in have]
+        if new:
+            self.ws.append_rows([v for _, v, _ in new], value_input_option="RAW", table_range="A1")
+            stats["inserted"] = len(new)
+
+        self.store._save_projection(self.sheet, [(k, want[k][1]) for k, _ in kept] + [(k, h) for k, _, h in new])
+        return stats